@@ -17,7 +17,7 @@ def upgrade() -> None:
         sa.Column("id", sa.Integer(), primary_key=True),
         sa.Column("msisdn", sa.String(), nullable=False, unique=True),
         sa.Column("name", sa.String()),
-        sa.Column("opt_out", sa.Boolean(), nullable=False, server_default=sa.text("0")),
+        sa.Column("opt_out", sa.Boolean(), nullable=False, server_default=sa.false()),
         sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
     )
 
@@ -44,7 +44,7 @@ def upgrade() -> None:
         sa.Column("id", sa.Integer(), primary_key=True),
         sa.Column("name", sa.String(), nullable=False),
         sa.Column("port", sa.String(), nullable=False, unique=True),
-        sa.Column("active", sa.Boolean(), nullable=False, server_default=sa.text("1")),
+        sa.Column("active", sa.Boolean(), nullable=False, server_default=sa.true()),
     )
 
     op.create_table(
@@ -0,0 +1,20 @@
+"""Index timestamp columns used by data retention."""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0002_retention_indexes"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_messages_created_at", "messages", ["created_at"])
+    op.create_index("ix_audit_timestamp", "audit", ["timestamp"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_timestamp", table_name="audit")
+    op.drop_index("ix_messages_created_at", table_name="messages")
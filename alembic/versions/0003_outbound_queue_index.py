@@ -0,0 +1,18 @@
+"""Index messages by status for outbound queue claiming."""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0003_outbound_queue_index"
+down_revision = "0002_retention_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_messages_status_id", "messages", ["status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_status_id", table_name="messages")
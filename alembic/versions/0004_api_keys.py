@@ -0,0 +1,33 @@
+"""Add API keys for machine clients."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_api_keys"
+down_revision = "0003_outbound_queue_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "api_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("key_id", sa.String(), nullable=False, unique=True),
+        sa.Column("key_hash", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False, server_default="viewer"),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            nullable=False,
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+        ),
+        sa.Column("revoked_at", sa.DateTime()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("api_keys")
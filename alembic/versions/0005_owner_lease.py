@@ -0,0 +1,35 @@
+"""Add the owner lease and persisted campaign status."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_owner_lease"
+down_revision = "0004_api_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "leases",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("holder", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.add_column(
+        "campaigns",
+        sa.Column("status", sa.String(), nullable=False, server_default="scheduled"),
+    )
+    # Campaigns that already started were sent by the old in-process
+    # scheduler; only future ones are left for the owner to pick up.
+    op.execute(
+        "UPDATE campaigns SET status = 'done' WHERE start_time <= CURRENT_TIMESTAMP"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("campaigns") as batch:
+        batch.drop_column("status")
+    op.drop_table("leases")
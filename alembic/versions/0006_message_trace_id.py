@@ -0,0 +1,20 @@
+"""Store the trace id of each message."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_message_trace_id"
+down_revision = "0005_owner_lease"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("trace_id", sa.String()))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("trace_id")
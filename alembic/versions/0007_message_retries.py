@@ -0,0 +1,25 @@
+"""Track send attempts and the next retry of each message."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_message_retries"
+down_revision = "0006_message_trace_id"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "messages",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("messages", sa.Column("next_attempt_at", sa.DateTime()))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("next_attempt_at")
+        batch.drop_column("attempts")
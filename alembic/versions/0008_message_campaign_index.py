@@ -0,0 +1,20 @@
+"""Index messages by campaign and contact for progress and planning."""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0008_message_campaign_index"
+down_revision = "0007_message_retries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_messages_campaign_contact", "messages", ["campaign_id", "contact_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_campaign_contact", table_name="messages")
@@ -0,0 +1,20 @@
+"""Index messages by contact and time for recently-messaged filters."""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0009_message_contact_index"
+down_revision = "0008_message_campaign_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_messages_contact_created", "messages", ["contact_id", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_contact_created", table_name="messages")
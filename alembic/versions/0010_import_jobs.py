@@ -0,0 +1,35 @@
+"""Persist contact import jobs so any worker can report them."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_import_jobs"
+down_revision = "0009_message_contact_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("format", sa.String(), nullable=False),
+        sa.Column("list_name", sa.String()),
+        sa.Column("list_id", sa.Integer(), sa.ForeignKey("lists.id")),
+        sa.Column("rows", sa.Integer(), nullable=False),
+        sa.Column("imported", sa.Integer(), nullable=False),
+        sa.Column("invalid", sa.Integer(), nullable=False),
+        sa.Column("seconds", sa.Float(), nullable=False),
+        sa.Column("error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime()),
+    )
+    op.create_index("ix_import_jobs_finished_at", "import_jobs", ["finished_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_import_jobs_finished_at", table_name="import_jobs")
+    op.drop_table("import_jobs")
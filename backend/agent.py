@@ -0,0 +1,186 @@
+"""Modem agent serving the modems attached to one host.
+
+Runs next to the SIM banks and is driven by muxo nodes listed in their
+``MODEM_AGENTS``. It exposes probing, batched sending and a server-sent
+event stream of inbound messages and delivery reports; it keeps no database.
+Start it with a shared secret::
+
+    AGENT_TOKEN=... uvicorn backend.agent:app --host 0.0.0.0 --port 8700
+"""
+
+from __future__ import annotations
+
+import collections
+import itertools
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from backend.devices.serial_port import open_port, probe_modems
+from backend.devices.simulator import SIM_PREFIX, inject_inbound
+from backend.events import EventBus, sse_stream
+from backend.metrics import CONTENT_TYPE, render_metrics
+from backend.sms.receiver import start_receiver
+from backend.sms.sender import send_sms
+from backend.tracing import trace
+
+AGENT_TOKEN = os.getenv("AGENT_TOKEN", "")
+AGENT_SEND_WORKERS = int(os.getenv("AGENT_SEND_WORKERS", "8"))
+AGENT_BACKLOG = int(os.getenv("AGENT_BACKLOG", "1000"))
+
+app = FastAPI()
+BUS = EventBus()
+RECEIVERS: list = []
+STOP = threading.Event()
+_SEND_POOL = ThreadPoolExecutor(AGENT_SEND_WORKERS)
+_PORT_LOCKS: dict[str, threading.Lock] = collections.defaultdict(threading.Lock)
+# Recent events, so a reconnecting node can catch up on what it missed.
+_BACKLOG: collections.deque[dict] = collections.deque(maxlen=AGENT_BACKLOG)
+_SEQ = itertools.count(1)
+_SEQ_LOCK = threading.Lock()
+
+
+def require_token(x_agent_token: str = Header("")) -> None:
+    if not secrets.compare_digest(x_agent_token, AGENT_TOKEN):
+        raise HTTPException(status_code=401, detail="invalid agent token")
+
+
+def _publish(event: dict) -> None:
+    # Publishing under the lock keeps replay and live events from overlapping.
+    with _SEQ_LOCK:
+        event["seq"] = next(_SEQ)
+        _BACKLOG.append(event)
+        BUS.publish(event)
+
+
+def _on_inbound(msisdn: str, text: str, device_id: str, port=None) -> None:
+    _publish({"type": "inbound", "port": device_id, "msisdn": msisdn, "text": text})
+
+
+def _on_dlr(ref: str, status: int, device_id: str) -> None:
+    _publish({"type": "dlr", "port": device_id, "ref": ref, "status": status})
+
+
+@app.on_event("startup")
+def _startup() -> None:
+    if not AGENT_TOKEN:
+        raise RuntimeError("AGENT_TOKEN must be set")
+    STOP.clear()
+    for dev in probe_modems():
+        if dev.get("sim_ready"):
+            RECEIVERS.append(
+                start_receiver(
+                    dev["port"], stop=STOP, on_inbound=_on_inbound, on_dlr=_on_dlr
+                )
+            )
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    STOP.set()
+    for thread in RECEIVERS:
+        thread.join(10)
+    RECEIVERS.clear()
+
+
+@app.get("/healthz")
+def healthz() -> dict[str, object]:
+    return {"status": "ok", "receivers": len(RECEIVERS)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.get("/probe", dependencies=[Depends(require_token)])
+def api_probe() -> list[dict]:
+    return probe_modems()
+
+
+class SendItem(BaseModel):
+    port: str
+    msisdn: str
+    text: str
+    trace_id: str | None = None
+
+
+class SendBatch(BaseModel):
+    messages: list[SendItem]
+
+
+def _send_on_port(port: str, items: list[tuple[int, SendItem]]) -> list[tuple]:
+    results = []
+    with _PORT_LOCKS[port]:
+        try:
+            handle = open_port(port)
+        except Exception as exc:  # pragma: no cover - hardware dependent
+            return [(index, {"error": str(exc)}) for index, _ in items]
+        with handle:
+            for index, item in items:
+                try:
+                    with trace(item.trace_id):
+                        refs = send_sms(item.msisdn, item.text, port, port=handle)
+                except Exception as exc:  # pragma: no cover - hardware dependent
+                    results.append((index, {"error": str(exc)}))
+                else:
+                    results.append((index, {"refs": refs}))
+    return results
+
+
+@app.post("/send", dependencies=[Depends(require_token)])
+def api_send(batch: SendBatch) -> dict[str, list[dict]]:
+    """Send a batch, keeping each port open for all of its messages.
+
+    Ports are driven in parallel; results are returned in request order.
+    """
+    by_port: dict[str, list[tuple[int, SendItem]]] = {}
+    for index, item in enumerate(batch.messages):
+        by_port.setdefault(item.port, []).append((index, item))
+    results: list[dict] = [{}] * len(batch.messages)
+    futures = [_SEND_POOL.submit(_send_on_port, p, i) for p, i in by_port.items()]
+    for future in futures:
+        for index, result in future.result():
+            results[index] = result
+    return {"results": results}
+
+
+@app.get("/events", dependencies=[Depends(require_token)])
+async def api_events(request: Request, after: int | None = None) -> StreamingResponse:
+    """Stream events; ``after`` replays buffered events newer than that seq."""
+    with _SEQ_LOCK:
+        sub = BUS.subscribe()
+        missed = [e for e in _BACKLOG if after is not None and e["seq"] > after]
+    for event in missed:
+        sub._offer(event)
+    return StreamingResponse(
+        sse_stream(request, sub, BUS), media_type="text/event-stream"
+    )
+
+
+class InboundIn(BaseModel):
+    port: str
+    msisdn: str
+    text: str
+
+
+@app.post("/simulate/inbound", dependencies=[Depends(require_token)])
+def api_simulate_inbound(data: InboundIn) -> dict[str, str]:
+    """Have a simulated modem receive a message, for local testing."""
+    if not data.port.startswith(SIM_PREFIX):
+        raise HTTPException(status_code=400, detail="not a simulated port")
+    inject_inbound(data.port, data.msisdn, data.text)
+    return {"status": "injected"}
+
+
+if __name__ == "__main__":  # pragma: no cover - manual entry point
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("AGENT_PORT", "8700")))
@@ -0,0 +1,150 @@
+"""Long-lived API keys for machine clients.
+
+Keys look like ``muxo_<key_id>_<secret>``. Only an HMAC-SHA256 of the full
+key is stored, so verification is a dictionary lookup by ``key_id`` plus one
+constant-time digest comparison against an in-memory index.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.db import SessionLocal
+from backend.models import ApiKey, User
+
+API_KEY_PREFIX = "muxo_"
+API_KEY_SECRET = os.getenv("API_KEY_SECRET") or os.getenv("JWT_SECRET", "change-me")
+API_KEY_INDEX_TTL = float(os.getenv("API_KEY_INDEX_TTL", "30"))
+# Minimum seconds between database lookups of key ids missing from the index.
+API_KEY_MISS_INTERVAL = float(os.getenv("API_KEY_MISS_INTERVAL", "1"))
+
+# key_id -> (key_hash, role, name) for every active key.
+_INDEX: dict[str, tuple[str, str, str]] = {}
+_loaded_at = 0.0
+_missed_at = 0.0
+_lock = threading.Lock()
+_miss_lock = threading.Lock()
+_PENDING_KEY = "pending_api_keys"
+
+
+def hash_api_key(key: str) -> str:
+    return hmac.new(API_KEY_SECRET.encode(), key.encode(), hashlib.sha256).hexdigest()
+
+
+def _active_keys(*criteria) -> list:
+    db = SessionLocal()
+    try:
+        return (
+            db.query(ApiKey.key_id, ApiKey.key_hash, ApiKey.role, ApiKey.name)
+            .filter(ApiKey.revoked_at.is_(None), *criteria)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def _load_index() -> None:
+    """Reload the index if it is stale; one thread queries, the rest wait."""
+    global _loaded_at
+    with _lock:
+        # Re-checked under the lock: another thread may have just reloaded.
+        if time.monotonic() - _loaded_at <= API_KEY_INDEX_TTL:
+            return
+        index = {r.key_id: (r.key_hash, r.role, r.name) for r in _active_keys()}
+        # Updated in place without emptying it, as readers do not take the lock.
+        for key_id in _INDEX.keys() - index.keys():
+            del _INDEX[key_id]
+        _INDEX.update(index)
+        _loaded_at = time.monotonic()
+
+
+def _lookup_missing(key_id: str) -> tuple[str, str, str] | None:
+    """Fetch a key created on another node since the last reload.
+
+    Lookups are limited to one per ``API_KEY_MISS_INTERVAL`` across all key
+    ids, so requests with made-up keys cannot turn into a query each.
+    """
+    global _missed_at
+    with _miss_lock:
+        now = time.monotonic()
+        if now - _missed_at < API_KEY_MISS_INTERVAL:
+            return None
+        _missed_at = now
+    rows = _active_keys(ApiKey.key_id == key_id)
+    if not rows:
+        return None
+    entry = (rows[0].key_hash, rows[0].role, rows[0].name)
+    with _lock:
+        _INDEX[key_id] = entry
+    return entry
+
+
+def verify_api_key(key: str) -> User | None:
+    """Return a detached principal for a valid key, otherwise ``None``.
+
+    The index is reloaded from the database every ``API_KEY_INDEX_TTL``
+    seconds, which bounds how long a key revoked on another node keeps
+    working. A key id missing from the index is looked up once, subject to
+    ``API_KEY_MISS_INTERVAL``, so keys created on another node work at once.
+    """
+    if not key.startswith(API_KEY_PREFIX):
+        return None
+    key_id, _, secret = key[len(API_KEY_PREFIX) :].partition("_")
+    if not secret:
+        return None
+    if time.monotonic() - _loaded_at > API_KEY_INDEX_TTL:
+        _load_index()
+    entry = _INDEX.get(key_id) or _lookup_missing(key_id)
+    if entry is None:
+        return None
+    key_hash, role, name = entry
+    if not hmac.compare_digest(key_hash, hash_api_key(key)):
+        return None
+    return User(username=f"apikey:{name}", role=role)
+
+
+def create_api_key(db: Session, name: str, role: str) -> tuple[ApiKey, str]:
+    """Create a key and return it with its plaintext, which is not stored.
+
+    The caller commits.
+    """
+    key_id = secrets.token_hex(6)
+    key = f"{API_KEY_PREFIX}{key_id}_{secrets.token_urlsafe(32)}"
+    obj = ApiKey(name=name, key_id=key_id, key_hash=hash_api_key(key), role=role)
+    db.add(obj)
+    # Indexed once committed, so a rolled back key never works.
+    db.info.setdefault(_PENDING_KEY, []).append((key_id, (obj.key_hash, role, name)))
+    return obj, key
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _index_created(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, ())
+    if pending:
+        with _lock:
+            _INDEX.update(pending)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_created(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def revoke_api_key(db: Session, obj: ApiKey) -> None:
+    """Revoke a key; it stops working on this node immediately.
+
+    Unlike creation this does not wait for the commit: after a rollback the
+    key is back at the next index reload.
+    """
+    obj.revoked_at = datetime.utcnow()
+    with _lock:
+        _INDEX.pop(obj.key_id, None)
@@ -0,0 +1,138 @@
+"""Audit trail recording that avoids a second commit per mutation.
+
+In the default ``transaction`` mode the audit row joins the caller's
+session and is written by the caller's own commit. In ``buffered`` mode rows
+are handed to a background writer once the caller's transaction commits and
+are inserted in batches; the queue is bounded and drained on shutdown.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from backend.db import SessionLocal, engine
+from backend.models import Audit
+
+AUDIT_MODE = os.getenv("AUDIT_MODE", "transaction")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+
+_PENDING_KEY = "pending_audit"
+
+
+class AuditWriter:
+    """Background thread inserting queued audit rows in batches."""
+
+    def __init__(
+        self,
+        maxsize: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        interval: float = AUDIT_FLUSH_INTERVAL,
+    ) -> None:
+        self.queue: queue.Queue[dict] = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, row: dict) -> None:
+        """Queue a row, blocking while the queue is full."""
+        self.queue.put(row)
+
+    def _drain(self) -> list[dict]:
+        batch: list[dict] = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[dict]) -> None:
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(Audit), batch)
+        except Exception as exc:  # pragma: no cover - best effort
+            logging.error("failed to write %d audit rows: %s", len(batch), exc)
+
+    def flush(self) -> None:
+        """Write everything queued so far from the calling thread."""
+        while batch := self._drain():
+            self._write(batch)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self.queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            self._write([first] + self._drain())
+        self.flush()
+
+    def stop(self) -> None:
+        """Stop the writer thread after flushing all queued rows."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+WRITER = AuditWriter()
+
+
+def log_audit(db: Session, table: str, record_id: int, action: str) -> None:
+    """Record an audit entry as part of ``db``'s current transaction.
+
+    Nothing is committed here; the entry is persisted by the caller's next
+    commit and discarded if the transaction rolls back.
+    """
+    row = {
+        "table_name": table,
+        "record_id": record_id,
+        "action": action,
+        "timestamp": datetime.utcnow(),
+    }
+    if AUDIT_MODE == "buffered" and WRITER.running:
+        db.info.setdefault(_PENDING_KEY, []).append(row)
+    else:
+        db.add(Audit(**row))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _submit_pending(session: Session) -> None:
+    for row in session.info.pop(_PENDING_KEY, ()):
+        WRITER.submit(row)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def start_audit_writer() -> None:
+    if AUDIT_MODE == "buffered":
+        WRITER.start()
+
+
+def stop_audit_writer() -> None:
+    WRITER.stop()
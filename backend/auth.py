@@ -2,32 +2,57 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import cache
 
 from fastapi import Depends, HTTPException
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
 
-from .db import get_session
+from .apikeys import API_KEY_PREFIX, verify_api_key
+from .db import SessionLocal
 from .models import User
 
 SECRET_KEY = os.getenv("JWT_SECRET", "change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer()
+security = HTTPBearer(auto_error=False)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+# bcrypt runs on its own small pool so login bursts cannot occupy the
+# request threadpool; the semaphore caps how many logins may wait for it.
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE)
+
+
+@cache
+def _pwd_context():
+    # Imported on first use; passlib and its backends are slow to load.
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 def authenticate_user(db: Session, username: str, password: str) -> User | None:
@@ -37,26 +62,177 @@ def authenticate_user(db: Session, username: str, password: str) -> User | None:
     return user
 
 
+def _authenticate_detached(username: str, password: str) -> User | None:
+    db = SessionLocal()
+    try:
+        user = authenticate_user(db, username, password)
+        if not user:
+            return None
+        return User(id=user.id, username=user.username, role=user.role)
+    finally:
+        db.close()
+
+
+async def authenticate_user_async(username: str, password: str) -> User | None:
+    """Check a password on the bounded password-hash executor.
+
+    Raises 503 when too many logins are already waiting.
+    """
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="too many concurrent logins")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _password_executor, _authenticate_detached, username, password
+        )
+    finally:
+        _password_slots.release()
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
+    from jose import jwt
+
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    expire = datetime.utcnow() + (
+        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_session),
-) -> User:
-    token = credentials.credentials
+class _TTLCache:
+    """Small thread-safe LRU mapping whose entries expire at a given time."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, expires: float) -> None:
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# Verified token -> subject, kept until the token expires.
+_TOKENS = _TTLCache(AUTH_CACHE_SIZE)
+# Subject -> detached principal, kept for AUTH_CACHE_TTL seconds.
+_PRINCIPALS = _TTLCache(AUTH_CACHE_SIZE)
+_CHANGED_KEY = "changed_usernames"
+
+
+def _token_subject(token: str) -> str:
+    username = _TOKENS.get(token)
+    if username is not None:
+        return username
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="invalid token")
     except JWTError as exc:  # pragma: no cover - simple exception path
         raise HTTPException(status_code=401, detail="invalid token") from exc
-    user = db.query(User).filter(User.username == username).first()
+    username = payload.get("sub")
+    if username is None:
+        raise HTTPException(status_code=401, detail="invalid token")
+    ttl = payload["exp"] - time.time() if "exp" in payload else AUTH_CACHE_TTL
+    _TOKENS.set(token, username, time.monotonic() + ttl)
+    return username
+
+
+def _load_principal(username: str) -> User | None:
+    principal = _PRINCIPALS.get(username)
+    if principal is not None:
+        return principal
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            return None
+        # A transient copy is safe to share between requests and threads.
+        principal = User(id=user.id, username=user.username, role=user.role)
+    finally:
+        db.close()
+    _PRINCIPALS.set(username, principal, time.monotonic() + AUTH_CACHE_TTL)
+    return principal
+
+
+def invalidate_user(username: str | None = None) -> None:
+    """Drop cached principals for ``username``, or for everyone."""
+    if username is None:
+        _PRINCIPALS.clear()
+    else:
+        _PRINCIPALS.pop(username)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    # Runs at flush; the cache is only dropped once the change is committed,
+    # so a concurrent request cannot re-cache the old row in between.
+    session = object_session(target)
+    if session is None:
+        return
+    usernames = session.info.setdefault(_CHANGED_KEY, set())
+    usernames.add(target.username)
+    history = inspect(target).attrs.username.history
+    usernames.update(history.deleted)
+    if history.added and not history.deleted:
+        # Renamed without the old name loaded; None drops every principal.
+        usernames.add(None)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_changed(session: Session) -> None:
+    for username in session.info.pop(_CHANGED_KEY, ()):
+        invalidate_user(username)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changed(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+    api_key: str | None = Depends(api_key_header),
+) -> User:
+    """Resolve a bearer token or API key to a user.
+
+    API keys are accepted in ``X-API-Key`` or as the bearer token. Neither
+    path touches the DB when cached. The returned user is a detached copy
+    with ``username`` and ``role`` set.
+    """
+    token = credentials.credentials if credentials else api_key
+    if not token:
+        raise HTTPException(status_code=401, detail="not authenticated")
+    if token.startswith(API_KEY_PREFIX):
+        principal = verify_api_key(token)
+        if principal is None:
+            raise HTTPException(status_code=401, detail="invalid api key")
+        return principal
+    username = _token_subject(token)
+    user = _load_principal(username)
     if not user:
         raise HTTPException(status_code=401, detail="user not found")
     return user
@@ -69,4 +245,3 @@ def require_role(*roles: str):
         return user
 
     return dependency
-
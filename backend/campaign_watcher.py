@@ -1,8 +1,12 @@
-"""Watch a folder for CSV campaign files and schedule sending."""
+"""Watch a folder for CSV campaign files and schedule sending.
+
+Campaigns are stored as ``scheduled``; the elected owner starts them.
+"""
 
 from __future__ import annotations
 
 import csv
+import itertools
 import logging
 import os
 from datetime import datetime
@@ -11,58 +15,47 @@ from pathlib import Path
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
+from backend.bulk import import_contacts, log_import_progress
 from backend.db import SessionLocal
-from backend.models import Campaign, Contact, List, ListMember
-from backend.utils import normalize_msisdn
+from backend.models import Campaign, List
 
 WATCH_DIR = Path(__file__).resolve().parent.parent / "inbox" / "campaigns"
 
 
 class _CampaignHandler(FileSystemEventHandler):
-    def __init__(self, scheduler):
-        super().__init__()
-        self.scheduler = scheduler
-
     def on_created(self, event) -> None:  # pragma: no cover - filesystem events
         if event.is_directory or not event.src_path.endswith(".csv"):
             return
         path = Path(event.src_path)
-        _process_csv(path, self.scheduler)
+        _process_csv(path)
 
 
-def _process_csv(path: Path, scheduler) -> None:
-    from backend.main import send_campaign  # local import to avoid circular
-
+def _process_csv(path: Path) -> None:
     db = SessionLocal()
     try:
         with path.open(newline="") as f:
             reader = csv.DictReader(f)
-            rows = list(reader)
-        if not rows:
-            return
-        name = path.stem
-        template = rows[0].get("text", "")
-        contact_ids: list[int] = []
-        list_obj = List(name=name)
-        db.add(list_obj)
-        db.commit()
-        db.refresh(list_obj)
-        for row in rows:
-            msisdn_raw = row.get("msisdn", "")
-            try:
-                msisdn = normalize_msisdn(msisdn_raw)
-            except ValueError as exc:
-                logging.warning("invalid number %s in %s: %s", msisdn_raw, path, exc)
-                continue
-            contact = db.query(Contact).filter(Contact.msisdn == msisdn).first()
-            if not contact:
-                contact = Contact(msisdn=msisdn)
-                db.add(contact)
-                db.commit()
-                db.refresh(contact)
-            db.add(ListMember(list_id=list_obj.id, contact_id=contact.id))
-            contact_ids.append(contact.id)
-        db.commit()
+            first = next(reader, None)
+            if first is None:
+                return
+            name = path.stem
+            template = first.get("text", "")
+            list_obj = List(name=name)
+            db.add(list_obj)
+            db.commit()
+            db.refresh(list_obj)
+            stats = import_contacts(
+                db,
+                itertools.chain([first], reader),
+                list_obj.id,
+                progress=log_import_progress,
+            )
+        logging.info(
+            "imported %s: %d contacts, %d invalid numbers",
+            path,
+            stats["imported"],
+            stats["invalid"],
+        )
         campaign = Campaign(
             name=name,
             template=template,
@@ -72,10 +65,6 @@ def _process_csv(path: Path, scheduler) -> None:
         )
         db.add(campaign)
         db.commit()
-        db.refresh(campaign)
-        scheduler.add_job(
-            send_campaign, "date", run_date=campaign.start_time, args=[campaign.id]
-        )
     except Exception as exc:  # pragma: no cover - best effort
         logging.error("failed to process %s: %s", path, exc)
     finally:
@@ -86,9 +75,9 @@ def _process_csv(path: Path, scheduler) -> None:
             pass
 
 
-def start_campaign_watcher(scheduler) -> Observer:
+def start_campaign_watcher() -> Observer:
     os.makedirs(WATCH_DIR, exist_ok=True)
-    handler = _CampaignHandler(scheduler)
+    handler = _CampaignHandler()
     observer = Observer()
     observer.schedule(handler, str(WATCH_DIR), recursive=False)
     observer.daemon = True
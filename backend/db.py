@@ -1,20 +1,43 @@
-"""Database setup using SQLAlchemy with optional SQLCipher support."""
+"""Database setup using SQLAlchemy with optional SQLCipher or PostgreSQL."""
 
 from __future__ import annotations
 
 import os
+import time
 
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from backend.metrics import DB_COMMIT
+from backend.tracing import record_span
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./muxo.db")
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
-SQLCIPHER_KEY = os.getenv("SQLCIPHER_KEY")
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+if IS_SQLITE:
+    engine = create_engine(
+        DATABASE_URL, connect_args={"check_same_thread": False}
+    )
+else:
+    # Pooled server connections: pre-ping drops connections killed by the
+    # server or a proxy, recycle keeps them below idle timeouts.
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+SQLCIPHER_KEY = os.getenv("SQLCIPHER_KEY") if IS_SQLITE else None
 
 if SQLCIPHER_KEY:
 
@@ -25,10 +48,35 @@ if SQLCIPHER_KEY:
         cursor.close()
 
 
+if IS_SQLITE:
+
+    @event.listens_for(engine, "connect")
+    def _set_auto_vacuum(dbapi_connection, connection_record) -> None:
+        # Only takes effect on a fresh database; existing files need a one-off
+        # ``maintenance.enable_incremental_vacuum()``.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        cursor.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+@event.listens_for(SessionLocal, "before_commit")
+def _commit_started(session) -> None:
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _commit_finished(session) -> None:
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        DB_COMMIT.observe(elapsed)
+        record_span("db_commit", elapsed)
+
+
 def get_session():
     """FastAPI dependency that yields a SQLAlchemy session."""
     db = SessionLocal()
@@ -36,4 +84,3 @@ def get_session():
         yield db
     finally:
         db.close()
-
@@ -0,0 +1,188 @@
+"""Remote modem agents as device providers.
+
+Agents are configured as ``MODEM_AGENTS="rack1=http://10.0.0.5:8700,..."``.
+A device whose port is ``<agent>:<local port>`` (for example
+``rack1:/dev/ttyUSB0``) is driven through that agent; any other port is a
+local serial device. Each agent is reached through one pooled HTTP session,
+and messages for the same agent are sent in a single request.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Hashable, Iterator, Sequence
+
+from backend.devices.lanes import TRANSACTIONAL, device_turn, device_turns
+from backend.devices.serial_port import probe_modems
+from backend.metrics import MESSAGES_FAILED, MESSAGES_SENT
+from backend.sms.retry import record_result
+from backend.sms.sender import send_sms
+from backend.tracing import current_trace_id, trace
+
+AGENT_TOKEN = os.getenv("AGENT_TOKEN", "")
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", "120"))
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))
+
+
+class AgentClient:
+    def __init__(self, name: str, url: str, token: str = AGENT_TOKEN) -> None:
+        # Deferred so deployments without agents never load requests.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.name = name
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=AGENT_POOL_SIZE, max_retries=1
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["X-Agent-Token"] = token
+
+    def probe(self) -> list[dict[str, Any]]:
+        response = self.session.get(f"{self.url}/probe", timeout=AGENT_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def send(self, messages: Sequence[dict[str, str]]) -> list[dict[str, Any]]:
+        """Send ``{"port", "msisdn", "text"}`` items; results keep their order."""
+        response = self.session.post(
+            f"{self.url}/send", json={"messages": list(messages)}, timeout=AGENT_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()["results"]
+
+    def events(self, after: int | None = None) -> Iterator[dict[str, Any]]:
+        """Yield inbound and delivery events until the stream ends."""
+        params = {"after": after} if after is not None else {}
+        with self.session.get(
+            f"{self.url}/events", params=params, stream=True, timeout=(10, 60)
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    yield json.loads(line[len("data: ") :])
+
+
+def _parse_agents(spec: str) -> dict[str, AgentClient]:
+    agents: dict[str, AgentClient] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, url = item.partition("=")
+        agents[name] = AgentClient(name, url)
+    return agents
+
+
+AGENTS = _parse_agents(os.getenv("MODEM_AGENTS", ""))
+
+
+def resolve(port: str) -> tuple[AgentClient | None, str]:
+    """Split a device port into its agent (``None`` if local) and local port."""
+    name, sep, local = port.partition(":")
+    if sep and name in AGENTS:
+        return AGENTS[name], local
+    return None, port
+
+
+def send_message(
+    msisdn: str,
+    text: str,
+    port: str,
+    lane: str = TRANSACTIONAL,
+    flow: Hashable = None,
+    weight: float = 1.0,
+) -> list[str]:
+    """Send one message through whichever provider owns ``port``.
+
+    The message waits for its turn on the device in ``lane``; see
+    :mod:`backend.devices.lanes`.
+    """
+    (result,) = send_many(
+        [(msisdn, text, port)], [current_trace_id()], lane, flow, weight
+    )
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def send_many(
+    items: Sequence[tuple[str, str, str]],
+    trace_ids: Sequence[str | None] | None = None,
+    lane: str = TRANSACTIONAL,
+    flow: Hashable = None,
+    weight: float = 1.0,
+) -> list[list[str] | Exception]:
+    """Send ``(msisdn, text, port)`` items, batching those for the same agent.
+
+    ``trace_ids`` are passed on to agents. Each local message takes its own
+    device turn; an agent batch holds the turns of all its ports while the
+    request is in flight. Returns the message references or the error for
+    each item, in order.
+    """
+    trace_ids = trace_ids or [None] * len(items)
+    results: list[list[str] | Exception] = [RuntimeError("not sent")] * len(items)
+    remote: dict[str, list[int]] = {}
+    for index, (msisdn, text, port) in enumerate(items):
+        agent, local = resolve(port)
+        if agent is not None:
+            remote.setdefault(agent.name, []).append(index)
+            continue
+        try:
+            with trace(trace_ids[index]), device_turn(port, lane, flow, weight):
+                results[index] = send_sms(msisdn, text, local)
+        except Exception as exc:  # pragma: no cover - hardware dependent
+            results[index] = exc
+    for name, indexes in remote.items():
+        import requests
+
+        agent = AGENTS[name]
+        batch = [
+            {
+                "port": resolve(items[i][2])[1],
+                "msisdn": items[i][0],
+                "text": items[i][1],
+                "trace_id": trace_ids[i],
+            }
+            for i in indexes
+        ]
+        try:
+            with device_turns((items[i][2] for i in indexes), lane, flow, weight):
+                replies = agent.send(batch)
+        except requests.RequestException as exc:
+            for i in indexes:
+                results[i] = exc
+            continue
+        for i, reply in zip(indexes, replies):
+            if "error" in reply:
+                results[i] = RuntimeError(reply["error"])
+            else:
+                results[i] = reply["refs"]
+    for (_, _, port), result in zip(items, results):
+        if isinstance(result, Exception):
+            MESSAGES_FAILED.inc(port)
+            record_result(port, result)
+        else:
+            MESSAGES_SENT.inc(port)
+            record_result(port)
+    return results
+
+
+def probe_devices() -> list[dict[str, Any]]:
+    """Probe local modems and every agent's modems.
+
+    Agent ports are prefixed with the agent name so they can be used as
+    device ports directly. Unreachable agents are reported with an error.
+    """
+    devices = probe_modems()
+    for name, agent in AGENTS.items():
+        import requests
+
+        try:
+            remote = agent.probe()
+        except requests.RequestException as exc:
+            devices.append({"agent": name, "error": str(exc)})
+            continue
+        for dev in remote:
+            devices.append({**dev, "port": f"{name}:{dev['port']}", "agent": name})
+    return devices
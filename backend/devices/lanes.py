@@ -0,0 +1,123 @@
+"""Per-device send scheduling with priority lanes.
+
+Every submission to a modem first takes that device's turn. Turns go to the
+``transactional`` lane (API sends, auto-replies, the outbound queue) before
+the ``campaign`` lane, so an urgent message waits for at most the one
+message already on the wire. Campaigns sharing a device are served by
+start-time fair queuing: each gets turns in proportion to its weight, and a
+campaign that falls idle does not bank credit.
+"""
+
+from __future__ import annotations
+
+import collections
+import heapq
+import itertools
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Hashable, Iterable, Iterator
+
+from backend.metrics import LANE_WAIT
+
+TRANSACTIONAL = "transactional"
+CAMPAIGN = "campaign"
+LANES = (TRANSACTIONAL, CAMPAIGN)
+
+
+class _Device:
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.busy = False
+        self.urgent: collections.deque[object] = collections.deque()
+        # (start tag, arrival, ticket) of waiting campaign sends.
+        self.bulk: list[tuple[float, int, object]] = []
+        self.vtime = 0.0
+        self.finish: dict[Hashable, float] = {}
+        self.arrivals = itertools.count()
+
+    def _head(self) -> object | None:
+        if self.urgent:
+            return self.urgent[0]
+        return self.bulk[0][2] if self.bulk else None
+
+    def acquire(self, lane: str, flow: Hashable, weight: float) -> None:
+        ticket = object()
+        with self.cond:
+            if lane == TRANSACTIONAL:
+                self.urgent.append(ticket)
+            else:
+                start = max(self.vtime, self.finish.get(flow, 0.0))
+                self.finish[flow] = start + 1.0 / max(weight, 1e-9)
+                heapq.heappush(self.bulk, (start, next(self.arrivals), ticket))
+            while self.busy or self._head() is not ticket:
+                self.cond.wait()
+            if lane == TRANSACTIONAL:
+                self.urgent.popleft()
+            else:
+                self.vtime = heapq.heappop(self.bulk)[0]
+                # Flows that finished before now start afresh at vtime anyway.
+                for key in [k for k, tag in self.finish.items() if tag <= self.vtime]:
+                    del self.finish[key]
+            self.busy = True
+
+    def release(self) -> None:
+        with self.cond:
+            self.busy = False
+            self.cond.notify_all()
+
+
+_DEVICES: dict[str, _Device] = {}
+_DEVICES_LOCK = threading.Lock()
+
+
+def _device(port: str) -> _Device:
+    with _DEVICES_LOCK:
+        return _DEVICES.setdefault(port, _Device())
+
+
+@contextmanager
+def device_turn(
+    port: str,
+    lane: str = TRANSACTIONAL,
+    flow: Hashable = None,
+    weight: float = 1.0,
+) -> Iterator[None]:
+    """Hold the turn on ``port`` for one submission.
+
+    ``flow`` identifies the campaign within the campaign lane and ``weight``
+    its share relative to other campaigns on the same device.
+    """
+    device = _device(port)
+    started = time.perf_counter()
+    device.acquire(lane, flow, weight)
+    LANE_WAIT.observe(time.perf_counter() - started, lane)
+    try:
+        yield
+    finally:
+        device.release()
+
+
+@contextmanager
+def device_turns(
+    ports: Iterable[str],
+    lane: str = TRANSACTIONAL,
+    flow: Hashable = None,
+    weight: float = 1.0,
+) -> Iterator[None]:
+    """Hold the turns on several ports, taken in a fixed order."""
+    with ExitStack() as stack:
+        for port in sorted(set(ports)):
+            stack.enter_context(device_turn(port, lane, flow, weight))
+        yield
+
+
+def waiting() -> dict[str, int]:
+    """Sends currently waiting for a turn, per lane."""
+    counts = dict.fromkeys(LANES, 0)
+    with _DEVICES_LOCK:
+        devices = list(_DEVICES.values())
+    for device in devices:
+        counts[TRANSACTIONAL] += len(device.urgent)
+        counts[CAMPAIGN] += len(device.bulk)
+    return counts
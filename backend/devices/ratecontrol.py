@@ -0,0 +1,116 @@
+"""Adaptive per-device submission rate (AIMD).
+
+Every ``AT+CMGS`` submission waits for its device's next slot. The rate
+grows by ``DEVICE_RATE_STEP`` submissions per second after each quick
+success and is halved (``DEVICE_RATE_BACKOFF``) on congestion: network-busy
+``+CMS ERROR`` codes, submissions that time out, or a submission much slower
+than the device's recent average. It stays between ``DEVICE_MIN_RATE`` and
+``DEVICE_MAX_RATE``, so each modem settles near what its SIM and cell can
+take. ``ADAPTIVE_RATE=0`` turns pacing off.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Iterator
+
+from backend.metrics import gauge_family, register_collector
+from backend.sms.retry import cms_code
+
+ADAPTIVE_RATE = os.getenv("ADAPTIVE_RATE", "1") != "0"
+DEVICE_MIN_RATE = float(os.getenv("DEVICE_MIN_RATE", "0.1"))
+DEVICE_MAX_RATE = float(os.getenv("DEVICE_MAX_RATE", "5"))
+DEVICE_START_RATE = float(os.getenv("DEVICE_START_RATE", "1"))
+DEVICE_RATE_STEP = float(os.getenv("DEVICE_RATE_STEP", "0.1"))
+DEVICE_RATE_BACKOFF = float(os.getenv("DEVICE_RATE_BACKOFF", "0.5"))
+# A submission this many times slower than the average counts as congestion.
+LATENCY_FACTOR = float(os.getenv("LATENCY_FACTOR", "3"))
+LATENCY_SMOOTHING = 0.1
+
+# Network out of order, temporary failure, congestion, resources
+# unavailable, no network service and network timeout.
+BUSY_CMS_ERRORS = frozenset({38, 41, 42, 47, 331, 332})
+
+
+class _Rate:
+    __slots__ = ("hold_until", "latency", "next_at", "rate")
+
+    def __init__(self) -> None:
+        self.rate = min(max(DEVICE_START_RATE, DEVICE_MIN_RATE), DEVICE_MAX_RATE)
+        self.next_at = 0.0
+        self.latency: float | None = None
+        self.hold_until = 0.0
+
+
+_RATES: dict[str, _Rate] = {}
+_LOCK = threading.Lock()
+
+
+def _state(port: str) -> _Rate:
+    state = _RATES.get(port)
+    if state is None:
+        state = _RATES[port] = _Rate()
+    return state
+
+
+def congested(error: Exception) -> bool:
+    """Whether ``error`` says the network or modem is overloaded."""
+    if isinstance(error, TimeoutError):
+        return True
+    return cms_code(error) in BUSY_CMS_ERRORS
+
+
+def pace(port: str) -> None:
+    """Block until ``port`` may take its next submission."""
+    if not ADAPTIVE_RATE:
+        return
+    with _LOCK:
+        state = _state(port)
+        now = time.monotonic()
+        slot = max(now, state.next_at)
+        state.next_at = slot + 1.0 / state.rate
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def record(port: str, seconds: float, error: Exception | None = None) -> None:
+    """Adjust the rate of ``port`` after a submission that took ``seconds``."""
+    if not ADAPTIVE_RATE:
+        return
+    with _LOCK:
+        state = _state(port)
+        now = time.monotonic()
+        if error is not None:
+            slow = congested(error)
+        else:
+            slow = (
+                state.latency is not None and seconds > state.latency * LATENCY_FACTOR
+            )
+            average = state.latency if state.latency is not None else seconds
+            state.latency = average + LATENCY_SMOOTHING * (seconds - average)
+        if slow:
+            # Back off once per interval, not once per in-flight failure.
+            if now >= state.hold_until:
+                state.rate = max(DEVICE_MIN_RATE, state.rate * DEVICE_RATE_BACKOFF)
+                state.hold_until = now + 1.0 / state.rate
+        elif error is None:
+            state.rate = min(DEVICE_MAX_RATE, state.rate + DEVICE_RATE_STEP)
+
+
+def rates() -> dict[str, float]:
+    with _LOCK:
+        return {port: state.rate for port, state in _RATES.items()}
+
+
+_SEND_RATE = gauge_family(
+    "muxo_device_send_rate", "Adaptive submission rate per second.", ("device",)
+)
+
+
+def _collect() -> Iterator[str]:
+    yield from _SEND_RATE({(port,): rate for port, rate in rates().items()})
+
+
+register_collector(_collect)
@@ -1,16 +1,36 @@
-"""Serial modem probing utilities."""
+"""Serial modem probing utilities.
+
+pyserial is imported when a real port is first opened, so simulated modems
+and nodes that only drive agents never load it.
+"""
 
 from __future__ import annotations
 
 import glob
 import logging
-from typing import Any
+import time
+from typing import TYPE_CHECKING, Any
+
+from backend.devices.simulator import SIM_PREFIX, SimulatedPort, simulated_ports
+from backend.metrics import AT_LATENCY
+
+if TYPE_CHECKING:
+    import serial
+
+
+def open_port(
+    path: str, baud: int = 115200, timeout: float = 5.0
+) -> serial.Serial | SimulatedPort:
+    """Open a modem port; ``sim:`` paths get a simulated modem."""
+    if path.startswith(SIM_PREFIX):
+        return SimulatedPort(path, timeout=timeout)
+    import serial
 
-import serial
-from serial import SerialException
+    return serial.Serial(path, baudrate=baud, timeout=timeout)
 
 
 def _send_command(port: serial.Serial, command: str) -> list[str]:
+    started = time.perf_counter()
     port.write((command + "\r").encode())
     lines: list[str] = []
     while True:
@@ -20,15 +40,17 @@ def _send_command(port: serial.Serial, command: str) -> list[str]:
         lines.append(line)
         if line in {"OK", "ERROR"}:
             break
+    name = command[3:].rstrip("?") or "AT"
+    AT_LATENCY.observe(time.perf_counter() - started, port.name, name)
     return lines
 
 
 def probe_modems(baud: int = 115200, timeout: float = 1.0) -> list[dict[str, Any]]:
-    """Probe /dev/ttyUSB* ports for AT-capable modems."""
+    """Probe /dev/ttyUSB* and simulated ports for AT-capable modems."""
     devices: list[dict[str, Any]] = []
-    for path in glob.glob("/dev/ttyUSB*"):
+    for path in glob.glob("/dev/ttyUSB*") + simulated_ports():
         try:
-            with serial.Serial(path, baudrate=baud, timeout=timeout) as port:
+            with open_port(path, baud, timeout) as port:
                 at = _send_command(port, "AT")
                 if not at or at[-1] != "OK":
                     continue
@@ -53,7 +75,8 @@ def probe_modems(baud: int = 115200, timeout: float = 1.0) -> list[dict[str, Any
                         "sim_ready": sim_ready,
                     }
                 )
-        except SerialException as exc:  # pragma: no cover - hardware dependent
+        except OSError as exc:  # pragma: no cover - hardware dependent
+            # Includes serial.SerialException.
             logging.warning("probe failed for %s: %s", path, exc)
         except Exception as exc:  # pragma: no cover - best effort
             logging.warning("unexpected error for %s: %s", path, exc)
@@ -0,0 +1,138 @@
+"""Simulated AT modems for running without hardware.
+
+``SIMULATED_MODEMS=<n>`` adds ports ``sim:0`` to ``sim:<n-1>`` to the probe
+results. Opening one returns a :class:`SimulatedPort` that answers the AT
+commands used by the sender, receiver and probe, reports a delivery for
+every submitted message and can be handed inbound messages with
+:func:`inject_inbound` or told to reject submissions with
+:func:`fail_submissions`.
+"""
+
+from __future__ import annotations
+
+import collections
+import itertools
+import os
+import queue
+import threading
+from typing import Self
+
+from backend.sms.pdu import build_deliver_pdu, build_status_report_pdu
+
+SIMULATED_MODEMS = int(os.getenv("SIMULATED_MODEMS", "0"))
+SIM_PREFIX = "sim:"
+SIM_NUMBER = "+10000000000"
+# Seconds before a submitted message is reported delivered.
+SIM_DLR_DELAY = float(os.getenv("SIM_DLR_DELAY", "2"))
+
+_RESPONSES = {
+    "AT+CGMM": ["SIMULATED", "OK"],
+    "AT+CSQ": ["+CSQ: 20,0", "OK"],
+    "AT+CPIN?": ["+CPIN: READY", "OK"],
+}
+
+
+class _Modem:
+    def __init__(self) -> None:
+        # Unsolicited result codes, each a list of lines kept together.
+        self.unsolicited: queue.Queue[list[str]] = queue.Queue(maxsize=1000)
+        self.refs = itertools.cycle(range(1, 256))
+        self.lock = threading.Lock()
+        # +CMS ERROR codes to answer the next submissions with.
+        self.failures: collections.deque[int] = collections.deque()
+
+    def notify(self, lines: list[str]) -> None:
+        try:
+            self.unsolicited.put_nowait(lines)
+        except queue.Full:  # nobody is reading this modem
+            pass
+
+
+_MODEMS: dict[str, _Modem] = {}
+_MODEMS_LOCK = threading.Lock()
+
+
+def _modem(path: str) -> _Modem:
+    with _MODEMS_LOCK:
+        return _MODEMS.setdefault(path, _Modem())
+
+
+def simulated_ports() -> list[str]:
+    return [f"{SIM_PREFIX}{i}" for i in range(SIMULATED_MODEMS)]
+
+
+def inject_inbound(path: str, msisdn: str, text: str) -> None:
+    """Make the simulated modem at ``path`` report an inbound message."""
+    pdu = build_deliver_pdu(msisdn, text)
+    _modem(path).notify([f"+CMT: ,{len(pdu) // 2 - 1}", pdu])
+
+
+def fail_submissions(path: str, code: int, count: int = 1) -> None:
+    """Make the next ``count`` submissions to ``path`` fail with ``code``."""
+    modem = _modem(path)
+    with modem.lock:
+        modem.failures.extend([code] * count)
+
+
+class SimulatedPort:
+    """The subset of ``serial.Serial`` the modem code relies on."""
+
+    def __init__(self, path: str, timeout: float | None = 5.0) -> None:
+        self.name = path
+        self.timeout = timeout
+        self.modem = _modem(path)
+        self._buffer = b""
+        self._pending: collections.deque[str] = collections.deque()
+        self._awaiting_pdu = False
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        pass
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        while True:
+            end = b"\x1a" if self._awaiting_pdu else b"\r"
+            command, sep, rest = self._buffer.partition(end)
+            if not sep:
+                break
+            self._buffer = rest
+            self._handle(command.decode(errors="ignore").strip())
+        return len(data)
+
+    def _handle(self, command: str) -> None:
+        if self._awaiting_pdu:
+            self._awaiting_pdu = False
+            with self.modem.lock:
+                failure = self.modem.failures.popleft() if self.modem.failures else None
+                ref = next(self.modem.refs)
+            if failure is not None:
+                self._pending.append(f"+CMS ERROR: {failure}")
+                return
+            self._pending.extend([f"+CMGS: {ref}", "OK"])
+            report = build_status_report_pdu(ref, SIM_NUMBER)
+            timer = threading.Timer(
+                SIM_DLR_DELAY,
+                self.modem.notify,
+                [[f"+CDS: {len(report) // 2 - 1}", report]],
+            )
+            timer.daemon = True
+            timer.start()
+        elif command.startswith("AT+CMGS="):
+            self._awaiting_pdu = True
+            self._pending.append("> ")
+        else:
+            self._pending.extend(_RESPONSES.get(command.upper(), ["OK"]))
+
+    def readline(self) -> bytes:
+        if not self._pending:
+            try:
+                self._pending.extend(self.modem.unsolicited.get(timeout=self.timeout))
+            except queue.Empty:
+                return b""
+        return (self._pending.popleft() + "\r\n").encode()
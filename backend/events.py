@@ -0,0 +1,108 @@
+"""In-process event bus feeding the real-time status stream.
+
+Send and delivery-report paths publish from worker threads; each streaming
+connection owns a bounded queue on the event loop. A slow client never
+blocks publishers: when its queue is full the oldest events are dropped and
+the client is told how many it missed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from typing import AsyncIterator
+
+from starlette.requests import Request
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+EVENT_HEARTBEAT = float(os.getenv("EVENT_HEARTBEAT", "15"))
+
+
+class Subscription:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        campaign_id: int | None = None,
+        device_id: int | None = None,
+        maxsize: int = EVENT_QUEUE_SIZE,
+    ) -> None:
+        self.loop = loop
+        self.campaign_id = campaign_id
+        self.device_id = device_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def matches(self, event: dict) -> bool:
+        if (
+            self.campaign_id is not None
+            and event.get("campaign_id") != self.campaign_id
+        ):
+            return False
+        return self.device_id is None or event.get("device_id") == self.device_id
+
+    def _offer(self, event: dict) -> None:
+        # Runs on the event loop, so the queue is never touched concurrently.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        """Return the next event, or a ``lagged`` notice after drops."""
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return {"type": "lagged", "dropped": dropped}
+        return await self.queue.get()
+
+
+class EventBus:
+    def __init__(self) -> None:
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, **filters) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), **filters)
+        with self._lock:
+            self._subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(sub)
+
+    def pending(self) -> int:
+        """Events queued for subscribers but not yet streamed."""
+        with self._lock:
+            return sum(s.queue.qsize() for s in self._subscriptions)
+
+    def publish(self, event: dict) -> None:
+        """Hand ``event`` to every matching subscriber; safe from any thread."""
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.matches(event)]
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:  # pragma: no cover - loop already closed
+                self.unsubscribe(sub)
+
+
+BUS = EventBus()
+
+
+async def sse_stream(
+    request: Request, sub: Subscription, bus: EventBus = BUS
+) -> AsyncIterator[str]:
+    """Format events from ``sub`` as server-sent events until disconnect."""
+    try:
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(sub.get(), EVENT_HEARTBEAT)
+            except TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            kind = event.get("type", "status")
+            yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        bus.unsubscribe(sub)
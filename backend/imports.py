@@ -0,0 +1,139 @@
+"""Background contact import jobs fed by streamed uploads.
+
+Job state lives in the ``import_jobs`` table, so any worker can report on
+an import and finished jobs are purged with the other retention data.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import update
+
+from backend.audit import log_audit
+from backend.bulk import import_contacts
+from backend.db import SessionLocal
+from backend.models import ImportJob, List
+
+# Largest upload accepted by the import endpoint, in bytes.
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(1 << 30)))
+
+
+def _ndjson_row(line: str) -> dict:
+    """Parse one NDJSON line; unusable lines become a row without a number.
+
+    ``import_contacts`` counts such rows as invalid, like a bad CSV row.
+    """
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(row, dict):
+        return {}
+    msisdn = row.get("msisdn")
+    name = row.get("name")
+    return {
+        "msisdn": "" if msisdn is None else str(msisdn),
+        "name": None if name is None else str(name),
+    }
+
+
+def _read_rows(path: str, fmt: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "ndjson":
+            for line in f:
+                if line.strip():
+                    yield _ndjson_row(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _update_job(job_id: str, **values) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(ImportJob).where(ImportJob.id == job_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _progress(job_id: str):
+    def report(stats: dict) -> None:
+        _update_job(
+            job_id,
+            rows=stats["rows"],
+            imported=stats["imported"],
+            invalid=stats["invalid"],
+            seconds=stats["seconds"],
+        )
+
+    return report
+
+
+def _run_import(job_id: str, path: str, fmt: str, list_name: str | None) -> None:
+    db = SessionLocal()
+    try:
+        list_id = None
+        if list_name:
+            list_obj = db.query(List).filter(List.name == list_name).first()
+            if not list_obj:
+                list_obj = List(name=list_name)
+                db.add(list_obj)
+                db.commit()
+            list_id = list_obj.id
+        _update_job(job_id, status="running", list_id=list_id)
+        import_contacts(db, _read_rows(path, fmt), list_id, progress=_progress(job_id))
+        if list_id is not None:
+            log_audit(db, "lists", list_id, "import")
+            db.commit()
+        _update_job(job_id, status="done", finished_at=datetime.utcnow())
+    except Exception as exc:
+        logging.error("import %s failed: %s", job_id, exc)
+        db.rollback()
+        _update_job(
+            job_id, status="failed", error=str(exc), finished_at=datetime.utcnow()
+        )
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def start_import(path: str, fmt: str, list_name: str | None = None) -> str:
+    """Import the uploaded file at ``path`` in a background thread.
+
+    The file is deleted once the import finishes. Returns the job id; the
+    job row is updated as chunks are committed. A job whose process dies
+    stays ``running``.
+    """
+    job_id = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        db.add(
+            ImportJob(
+                id=job_id,
+                status="queued",
+                format=fmt,
+                list_name=list_name,
+                rows=0,
+                imported=0,
+                invalid=0,
+                seconds=0.0,
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+    threading.Thread(
+        target=_run_import, args=(job_id, path, fmt, list_name), daemon=True
+    ).start()
+    return job_id
@@ -0,0 +1,145 @@
+"""Database lease electing the process that owns modems and schedules.
+
+Every worker runs an elector. Whichever holds the lease starts the
+scheduler, the campaign watcher, the serial receivers and the outbound
+worker; the others only serve the API and hand work to the owner through
+the database. The holder renews the lease every ``LEASE_RENEW`` seconds and
+gives up ownership as soon as a renewal fails, so another worker can take
+over once ``LEASE_TTL`` has passed without two owners overlapping. Starting
+and stopping the owned subsystems can take longer than ``LEASE_TTL`` (the
+modem probe alone takes a second per silent port), so those callbacks run
+in order on their own thread while the lease keeps being renewed.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import or_, update
+
+from backend.bulk import insert
+from backend.db import engine
+from backend.models import Lease
+
+LEASE_NAME = "owner"
+LEASE_TTL = float(os.getenv("LEASE_TTL", "15"))
+LEASE_RENEW = float(os.getenv("LEASE_RENEW", "5"))
+# "auto" takes part in the election, "api" never owns modems or schedules.
+MUXO_ROLE = os.getenv("MUXO_ROLE", "auto")
+
+
+class LeaderElector:
+    def __init__(
+        self,
+        on_elected: Callable[[], None],
+        on_demoted: Callable[[], None],
+        name: str = LEASE_NAME,
+        ttl: float = LEASE_TTL,
+        renew: float = LEASE_RENEW,
+    ) -> None:
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.name = name
+        self.ttl = ttl
+        self.renew = renew
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._transitions: queue.Queue[Callable[[], None] | None] = queue.Queue()
+        self._transition_thread: threading.Thread | None = None
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; return whether this process holds it."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        with engine.begin() as conn:
+            result = conn.execute(
+                update(Lease)
+                .where(
+                    Lease.name == self.name,
+                    or_(Lease.holder == self.holder, Lease.expires_at < now),
+                )
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            if result.rowcount:
+                return True
+            result = conn.execute(
+                insert(Lease.__table__)
+                .values(name=self.name, holder=self.holder, expires_at=expires_at)
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+            return bool(result.rowcount)
+
+    def release(self) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                update(Lease)
+                .where(Lease.name == self.name, Lease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+            )
+
+    def _tick(self) -> None:
+        try:
+            held = self.try_acquire()
+        except Exception as exc:  # pragma: no cover - database unavailable
+            logging.warning("lease renewal failed: %s", exc)
+            held = False
+        if held and not self.is_leader:
+            logging.info("acquired %s lease as %s", self.name, self.holder)
+            self.is_leader = True
+            self._transitions.put(self.on_elected)
+        elif not held and self.is_leader:
+            logging.warning("lost %s lease", self.name)
+            self.is_leader = False
+            self._transitions.put(self.on_demoted)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.renew):
+            self._tick()
+
+    def _run_transitions(self) -> None:
+        while (callback := self._transitions.get()) is not None:
+            try:
+                callback()
+            except Exception:  # pragma: no cover - best effort
+                logging.exception("%s lease transition failed", self.name)
+
+    def start(self) -> None:
+        """Try for the lease now, then keep renewing it in the background."""
+        if MUXO_ROLE == "api":
+            return
+        self._stop.clear()
+        self._transition_thread = threading.Thread(
+            target=self._run_transitions, name="lease-transitions", daemon=True
+        )
+        self._transition_thread.start()
+        self._tick()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        was_leader = self.is_leader
+        if was_leader:
+            self.is_leader = False
+            self._transitions.put(self.on_demoted)
+        if self._transition_thread:
+            self._transitions.put(None)
+            self._transition_thread.join()
+            self._transition_thread = None
+        if was_leader:
+            try:
+                self.release()
+            except Exception as exc:  # pragma: no cover - database unavailable
+                logging.warning("lease release failed: %s", exc)
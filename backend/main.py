@@ -3,45 +3,205 @@
 from __future__ import annotations
 
 import itertools
+import logging
+import os
+import tempfile
+import threading
 import time
 from datetime import datetime, timedelta
-
-from apscheduler.schedulers.background import BackgroundScheduler
-from fastapi import Depends, FastAPI, HTTPException
-from pydantic import BaseModel
+from typing import TYPE_CHECKING, Callable, Iterator
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from backend.apikeys import create_api_key, revoke_api_key
+from backend.audit import WRITER, log_audit, start_audit_writer, stop_audit_writer
 from backend.auth import (
-    authenticate_user,
+    authenticate_user_async,
     create_access_token,
     get_current_user,
     get_password_hash,
     require_role,
 )
-from backend.campaign_watcher import start_campaign_watcher
+from backend.bulk import upsert_contacts
 from backend.db import SessionLocal, get_session
+from backend.devices.agents import AGENTS, probe_devices, send_message
+from backend.devices.lanes import CAMPAIGN
+from backend.devices.lanes import waiting as lane_waiting
 from backend.devices.serial_port import probe_modems
+from backend.events import BUS, sse_stream
+from backend.imports import IMPORT_MAX_BYTES, start_import
+from backend.leader import LEASE_RENEW, MUXO_ROLE, LeaderElector
+from backend.lists import combine_lists, member_count, member_counts
 from backend.maintenance import nightly_backup
-from backend.models import Audit, Campaign, Contact, Device, ListMember, Message, User
-from backend.sms.receiver import start_receiver
-from backend.sms.sender import send_sms
+from backend.metrics import (
+    CONTENT_TYPE,
+    gauge_family,
+    register_collector,
+    render_metrics,
+)
+from backend.models import (
+    ApiKey,
+    Audit,
+    Campaign,
+    Contact,
+    Device,
+    ImportJob,
+    List,
+    ListMember,
+    Message,
+    User,
+)
+from backend.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    keyset,
+    set_next_cursor,
+    stream_ndjson,
+)
+from backend.planner import plan_campaign
+from backend.profiler import PROFILE_MAX_SECONDS, ProfilerBusy, collapsed, sample
+from backend.recipients import iter_recipients
+from backend.sms.outbound import start_outbound_worker, wake_outbound
+from backend.sms.receiver import (
+    release_held_report,
+    start_agent_listener,
+    start_receiver,
+)
+from backend.sms.retry import cooldown_left, healthy, record_failure
 from backend.sms.store import INBOX
-from backend.utils import normalize_msisdn, notify_status
+from backend.tracing import (
+    TraceMiddleware,
+    current_trace_id,
+    new_trace_id,
+    span,
+    trace,
+)
+from backend.utils import normalize_many, normalize_msisdn, notify_status
+from backend.webhooks import DISPATCHER
+
+if TYPE_CHECKING:
+    from apscheduler.schedulers.background import BackgroundScheduler
 
 app = FastAPI()
+
+
+app.add_middleware(TraceMiddleware)
+
+
 RECEIVERS: list = []
 WATCHERS: list = []
-SCHEDULER = BackgroundScheduler()
+SENDERS: list = []
+MAX_BATCH_MESSAGES = 10000
+CAMPAIGN_POLL_INTERVAL = float(os.getenv("CAMPAIGN_POLL_INTERVAL", "5"))
+# Created by the first owner term; apscheduler is slow to import.
+SCHEDULER: BackgroundScheduler | None = None
+# Set when this process stops owning modems; owned loops exit on it.
+OWNER_STOP = threading.Event()
+
+OWNED_SUBSYSTEMS = ("scheduler", "watcher", "outbound", "receivers")
+# Subsystem -> "pending", "starting", "ready", "standby", "disabled" or
+# "failed: <error>"; reported by /healthz.
+READINESS: dict[str, str] = dict.fromkeys(
+    ("audit", "admin", "lease", *OWNED_SUBSYSTEMS), "pending"
+)
 
 
-def log_audit(db: Session, table: str, record_id: int, action: str) -> None:
-    db.add(Audit(table_name=table, record_id=record_id, action=action))
-    db.commit()
+def _stage(name: str, start: Callable[[], None]) -> None:
+    READINESS[name] = "starting"
+    try:
+        start()
+    except Exception as exc:
+        logging.exception("starting %s failed", name)
+        READINESS[name] = f"failed: {exc}"
+    else:
+        READINESS[name] = "ready"
 
 
-@app.on_event("startup")
-def _startup() -> None:
+def _start_scheduler() -> None:
+    global SCHEDULER
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    db = SessionLocal()
+    try:
+        # Campaigns left running by a previous owner resume from where it
+        # stopped; contacts that already have a message are skipped.
+        db.execute(
+            update(Campaign)
+            .where(Campaign.status == "running")
+            .values(status="scheduled")
+        )
+        db.commit()
+    finally:
+        db.close()
+    if SCHEDULER is None:
+        SCHEDULER = BackgroundScheduler()
     SCHEDULER.start()
+    SCHEDULER.add_job(
+        nightly_backup, "cron", hour=0, id="nightly_backup", replace_existing=True
+    )
+    SCHEDULER.add_job(
+        dispatch_due_campaigns,
+        "interval",
+        seconds=CAMPAIGN_POLL_INTERVAL,
+        id="dispatch_campaigns",
+        replace_existing=True,
+    )
+
+
+def _start_watcher() -> None:
+    from backend.campaign_watcher import start_campaign_watcher
+
+    WATCHERS.append(start_campaign_watcher())
+
+
+def _start_outbound() -> None:
+    SENDERS.append(start_outbound_worker(OWNER_STOP))
+
+
+def _start_receivers() -> None:
+    for dev in probe_modems():
+        if dev.get("sim_ready"):
+            RECEIVERS.append(start_receiver(dev["port"], stop=OWNER_STOP))
+    for agent in AGENTS.values():
+        RECEIVERS.append(start_agent_listener(agent, OWNER_STOP))
+
+
+def _start_owned() -> None:
+    """Start the subsystems only the lease holder may run.
+
+    Probing the modems is the slowest step, so it comes last.
+    """
+    OWNER_STOP.clear()
+    _stage("scheduler", _start_scheduler)
+    _stage("watcher", _start_watcher)
+    _stage("outbound", _start_outbound)
+    _stage("receivers", _start_receivers)
+
+
+def _stop_owned() -> None:
+    OWNER_STOP.set()
+    if SCHEDULER is not None and SCHEDULER.running:
+        SCHEDULER.shutdown(wait=False)
+    for observer in WATCHERS:
+        observer.stop()
+    for thread in RECEIVERS + SENDERS:
+        thread.join(10)
+    RECEIVERS.clear()
+    WATCHERS.clear()
+    SENDERS.clear()
+    READINESS.update(dict.fromkeys(OWNED_SUBSYSTEMS, "standby"))
+
+
+ELECTOR = LeaderElector(on_elected=_start_owned, on_demoted=_stop_owned)
+
+
+def _ensure_admin() -> None:
     db = SessionLocal()
     try:
         if not db.query(User).first():
@@ -50,23 +210,152 @@ def _startup() -> None:
             )
             db.add(user)
             db.commit()
+    except IntegrityError:
+        # Another worker created it first.
+        db.rollback()
     finally:
         db.close()
-    SCHEDULER.add_job(nightly_backup, "cron", hour=0)
-    for dev in probe_modems():
-        if dev.get("sim_ready"):
-            RECEIVERS.append(start_receiver(dev["port"]))
-    WATCHERS.append(start_campaign_watcher(SCHEDULER))
+
+
+def _start_lease() -> None:
+    ELECTOR.start()
+    if not ELECTOR.is_leader:
+        READINESS.update(dict.fromkeys(OWNED_SUBSYSTEMS, "standby"))
+
+
+def _start_background() -> None:
+    _stage("admin", _ensure_admin)
+    _stage("lease", _start_lease)
+    if MUXO_ROLE == "api":
+        READINESS["lease"] = "disabled"
+
+
+@app.on_event("startup")
+def _startup() -> None:
+    """Serve requests right away and bring the rest up in the background."""
+    _stage("audit", start_audit_writer)
+    threading.Thread(target=_start_background, name="startup", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    ELECTOR.stop()
+    stop_audit_writer()
+    DISPATCHER.stop()
 
 
 @app.get("/healthz")
-def healthz() -> dict[str, str]:
-    return {"status": "ok"}
+def healthz() -> dict[str, object]:
+    """Report liveness and how far startup has got.
+
+    ``status`` is ``starting`` until every subsystem has come up and
+    ``degraded`` if one failed; the API serves requests in both cases.
+    """
+    states = READINESS.values()
+    if any(state.startswith("failed") for state in states):
+        status = "degraded"
+    elif any(state in ("pending", "starting") for state in states):
+        status = "starting"
+    else:
+        status = "ok"
+    return {"status": status, "owner": ELECTOR.is_leader, "subsystems": READINESS}
+
+
+_QUEUE_DEPTH = gauge_family(
+    "muxo_queue_depth", "Items waiting in each pipeline queue.", ("queue",)
+)
+_CAMPAIGN_RECIPIENTS = gauge_family(
+    "muxo_campaign_recipients", "List size of running campaigns.", ("campaign",)
+)
+_CAMPAIGN_MESSAGES = gauge_family(
+    "muxo_campaign_messages",
+    "Messages of running campaigns by status.",
+    ("campaign", "status"),
+)
+_OWNER = gauge_family("muxo_owner", "Whether this process owns the modems.")
+
+
+def _collect_pipeline():
+    yield from _OWNER({(): int(ELECTOR.is_leader)})
+    db = SessionLocal()
+    try:
+        statuses = dict(
+            db.execute(
+                select(Message.status, func.count())
+                .where(Message.status.in_(("queued", "sending")))
+                .group_by(Message.status)
+            ).all()
+        )
+        running = db.execute(
+            select(Campaign.id, func.count(ListMember.contact_id))
+            .join(ListMember, ListMember.list_id == Campaign.list_id)
+            .where(Campaign.status == "running")
+            .group_by(Campaign.id)
+        ).all()
+        progress = db.execute(
+            select(Message.campaign_id, Message.status, func.count())
+            .join(Campaign, Campaign.id == Message.campaign_id)
+            .where(Campaign.status == "running")
+            .group_by(Message.campaign_id, Message.status)
+        ).all()
+    finally:
+        db.close()
+    yield from _QUEUE_DEPTH(
+        {
+            ("outbound",): statuses.get("queued", 0),
+            ("sending",): statuses.get("sending", 0),
+            ("webhook",): DISPATCHER.queue.qsize(),
+            ("audit",): WRITER.queue.qsize(),
+            ("events",): BUS.pending(),
+            **{(f"lane_{lane}",): n for lane, n in lane_waiting().items()},
+        }
+    )
+    yield from _CAMPAIGN_RECIPIENTS({(c,): n for c, n in running})
+    yield from _CAMPAIGN_MESSAGES({(c, s): n for c, s, n in progress})
+
+
+register_collector(_collect_pipeline)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.post("/api/admin/profile", response_class=PlainTextResponse)
+def api_profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    user: User = Depends(require_role("admin")),
+) -> PlainTextResponse:
+    """Sample every thread for ``seconds`` and return collapsed stacks.
+
+    The output can be fed to flamegraph.pl or loaded into speedscope.
+    """
+    try:
+        stacks = sample(seconds)
+    except ProfilerBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return PlainTextResponse(collapsed(stacks))
+
+
+def require_owner() -> None:
+    """Reject requests that need the owner's modems or in-process state.
+
+    Probing needs the serial ports; status events and the inbox come from
+    the owner's send and receive loops, so another worker would silently
+    serve nothing.
+    """
+    if not ELECTOR.is_leader:
+        raise HTTPException(
+            status_code=503,
+            detail="modems are owned by another worker",
+            headers={"Retry-After": str(int(LEASE_RENEW))},
+        )
 
 
-@app.get("/api/devices/probe")
+@app.get("/api/devices/probe", dependencies=[Depends(require_owner)])
 def api_probe(user: User = Depends(get_current_user)) -> list[dict]:
-    return probe_modems()
+    return probe_devices()
 
 
 class LoginIn(BaseModel):
@@ -80,14 +369,81 @@ class TokenOut(BaseModel):
 
 
 @app.post("/api/login", response_model=TokenOut)
-def api_login(data: LoginIn, db: Session = Depends(get_session)) -> TokenOut:
-    user = authenticate_user(db, data.username, data.password)
+async def api_login(data: LoginIn) -> TokenOut:
+    user = await authenticate_user_async(data.username, data.password)
     if not user:
         raise HTTPException(status_code=401, detail="invalid credentials")
     token = create_access_token({"sub": user.username, "role": user.role})
     return TokenOut(access_token=token)
 
 
+class ApiKeyIn(BaseModel):
+    name: str
+    role: str = Field("viewer", pattern="^(viewer|ops|admin)$")
+
+
+class ApiKeyOut(BaseModel):
+    id: int
+    name: str
+    key_id: str
+    role: str
+    created_at: datetime
+    revoked_at: datetime | None
+
+    class Config:
+        orm_mode = True
+
+
+class ApiKeyCreated(ApiKeyOut):
+    key: str
+
+
+@app.post("/api/keys", response_model=ApiKeyCreated)
+def api_create_key(
+    data: ApiKeyIn,
+    db: Session = Depends(get_session),
+    user: User = Depends(require_role("admin")),
+):
+    """Create an API key; the plaintext key is only returned here."""
+    obj, key = create_api_key(db, data.name, data.role)
+    db.flush()
+    log_audit(db, "api_keys", obj.id, "create")
+    db.commit()
+    db.refresh(obj)
+    return ApiKeyCreated(
+        id=obj.id,
+        name=obj.name,
+        key_id=obj.key_id,
+        role=obj.role,
+        created_at=obj.created_at,
+        revoked_at=obj.revoked_at,
+        key=key,
+    )
+
+
+@app.get("/api/keys", response_model=list[ApiKeyOut])
+def api_list_keys(
+    db: Session = Depends(get_session),
+    user: User = Depends(require_role("admin")),
+):
+    return db.query(ApiKey).order_by(ApiKey.id).all()
+
+
+@app.delete("/api/keys/{key_id}")
+def api_revoke_key(
+    key_id: int,
+    db: Session = Depends(get_session),
+    user: User = Depends(require_role("admin")),
+):
+    obj = db.get(ApiKey, key_id)
+    if not obj:
+        raise HTTPException(status_code=404, detail="not found")
+    revoke_api_key(db, obj)
+    log_audit(db, "api_keys", obj.id, "revoke")
+    db.commit()
+    return {"status": "revoked"}
+
+
 class MessageIn(BaseModel):
     msisdn: str
     text: str
@@ -113,28 +469,146 @@ def api_send(
         db.add(contact)
         db.commit()
         db.refresh(contact)
-    try:
-        refs = send_sms(msisdn, message.text, message.device_id)
-    except Exception as exc:  # pragma: no cover - surface error
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    # Requests only carry a trace id when the caller sent one or spans are on.
+    trace_id = current_trace_id() or new_trace_id()
+    if not ELECTOR.is_leader:
+        # The owner's outbound worker sends it from the queue.
+        msg = Message(
+            contact_id=contact.id,
+            device_id=device.id,
+            text=message.text,
+            status="queued",
+            trace_id=trace_id,
+        )
+        db.add(msg)
+        db.commit()
+        return {
+            "id": msg.id,
+            "refs": [],
+            "status": msg.status,
+            "trace_id": msg.trace_id,
+        }
     msg = Message(
         contact_id=contact.id,
         device_id=device.id,
         text=message.text,
-        ref=refs[0] if refs else None,
-        status="sent",
+        status="sending",
+        attempts=0,
+        trace_id=trace_id,
     )
+    try:
+        with trace(trace_id):
+            refs = send_message(msisdn, message.text, message.device_id)
+    except Exception as exc:
+        db.add(msg)
+        # Transient failures are queued for the outbound worker to retry.
+        if record_failure(db, msg, exc):
+            db.commit()
+            wake_outbound()
+            return {
+                "id": msg.id,
+                "refs": [],
+                "status": msg.status,
+                "trace_id": msg.trace_id,
+            }
+        db.commit()
+        raise HTTPException(
+            status_code=502, detail={"id": msg.id, "error": msg.error_code}
+        ) from exc
+    msg.attempts = 1
+    msg.ref = refs[0] if refs else None
+    msg.status = "sent"
     db.add(msg)
     db.commit()
-    db.refresh(msg)
     notify_status(
         {
             "id": msg.id,
             "msisdn": msisdn,
             "status": msg.status,
+            "campaign_id": None,
+            "device_id": device.id,
         }
     )
-    return {"id": msg.id, "refs": refs}
+    release_held_report(db, msg, device.port)
+    return {
+        "id": msg.id,
+        "refs": refs,
+        "status": msg.status,
+        "trace_id": msg.trace_id,
+    }
+
+
+class BatchMessageIn(BaseModel):
+    msisdn: str
+    text: str | None = None
+    device_id: str | None = None
+
+
+class BatchIn(BaseModel):
+    text: str | None = None
+    device_id: str | None = None
+    messages: list[BatchMessageIn] = Field(..., max_length=MAX_BATCH_MESSAGES)
+
+
+@app.post("/api/messages/batch")
+def api_send_batch(
+    batch: BatchIn,
+    db: Session = Depends(get_session),
+    user: User = Depends(require_role("ops", "admin")),
+) -> dict[str, object]:
+    """Validate and queue many messages in one transaction.
+
+    ``text`` and ``device_id`` on the batch apply to items that omit them.
+    Queued messages are sent by the outbound worker. The response lists,
+    in request order, either the message id or the error for each item.
+    """
+    ports = {m.device_id or batch.device_id for m in batch.messages} - {None}
+    devices = dict(
+        db.execute(select(Device.port, Device.id).where(Device.port.in_(ports))).all()
+    )
+    normalized = normalize_many(m.msisdn for m in batch.messages)
+    contact_ids = upsert_contacts(db, [m for m in normalized if m is not None])
+    results: list[dict[str, object]] = []
+    rows: list[dict] = []
+    now = datetime.utcnow()
+    for index, (item, msisdn) in enumerate(zip(batch.messages, normalized)):
+        text = item.text or batch.text
+        device_id = devices.get(item.device_id or batch.device_id)
+        if msisdn is None:
+            results.append({"index": index, "error": "invalid msisdn"})
+        elif not text:
+            results.append({"index": index, "error": "text missing"})
+        elif device_id is None:
+            results.append({"index": index, "error": "device not found"})
+        else:
+            trace_id = new_trace_id()
+            results.append({"index": index, "id": None, "trace_id": trace_id})
+            rows.append(
+                {
+                    "contact_id": contact_ids[msisdn],
+                    "device_id": device_id,
+                    "text": text,
+                    "status": "queued",
+                    "trace_id": trace_id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+    if rows:
+        ids = db.scalars(
+            insert(Message).returning(Message.id, sort_by_parameter_order=True),
+            rows,
+        ).all()
+        pending = (r for r in results if "id" in r)
+        for result, msg_id in zip(pending, ids):
+            result["id"] = msg_id
+    db.commit()
+    wake_outbound()
+    return {
+        "queued": len(rows),
+        "failed": len(results) - len(rows),
+        "results": results,
+    }
 
 
 @app.get("/api/messages/{message_id}")
@@ -150,10 +624,32 @@ def api_message(
         "id": msg.id,
         "status": msg.status,
         "error_code": msg.error_code,
+        "attempts": msg.attempts,
         "ref": msg.ref,
+        "trace_id": msg.trace_id,
     }
 
 
+@app.get("/api/events", dependencies=[Depends(require_owner)])
+async def api_events(
+    request: Request,
+    campaign_id: int | None = None,
+    device_id: int | None = None,
+    user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """Stream message status changes as server-sent events.
+
+    ``campaign_id`` and ``device_id`` restrict the stream. Clients that fall
+    behind receive a ``lagged`` event with the number of dropped events.
+    """
+    sub = BUS.subscribe(campaign_id=campaign_id, device_id=device_id)
+    return StreamingResponse(
+        sse_stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 class ContactIn(BaseModel):
     msisdn: str
     name: str | None = None
@@ -167,12 +663,35 @@ class ContactOut(ContactIn):
         orm_mode = True
 
 
+CONTACT_COLUMNS = (Contact.id, Contact.msisdn, Contact.name, Contact.opt_out)
+
+
 @app.get("/api/contacts", response_model=list[ContactOut])
 def list_contacts(
+    response: Response,
+    after_id: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    opt_out: bool | None = None,
+    msisdn: str | None = None,
+    stream: bool = False,
     db: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    return db.query(Contact).all()
+    """List contacts by ascending id, one keyset page at a time.
+
+    ``msisdn`` matches as a prefix. With ``stream`` the whole filtered set
+    after ``after_id`` is returned as NDJSON and ``limit`` is ignored.
+    """
+    stmt = keyset(select(*CONTACT_COLUMNS), Contact.id, after_id)
+    if opt_out is not None:
+        stmt = stmt.where(Contact.opt_out.is_(opt_out))
+    if msisdn:
+        stmt = stmt.where(Contact.msisdn.startswith(msisdn, autoescape=True))
+    if stream:
+        return stream_ndjson(stmt)
+    rows = db.execute(stmt.limit(limit)).all()
+    set_next_cursor(response, rows, limit)
+    return rows
 
 
 @app.post("/api/contacts", response_model=ContactOut)
@@ -187,12 +706,76 @@ def create_contact(
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     obj = Contact(msisdn=msisdn, name=contact.name)
     db.add(obj)
+    db.flush()
+    log_audit(db, "contacts", obj.id, "create")
     db.commit()
     db.refresh(obj)
-    log_audit(db, "contacts", obj.id, "create")
     return obj
 
 
+@app.post("/api/contacts/import", status_code=202)
+async def import_contacts_upload(
+    request: Request,
+    list_name: str | None = None,
+    fmt: str | None = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    user: User = Depends(require_role("ops", "admin")),
+) -> dict[str, str]:
+    """Spool a streamed CSV or NDJSON upload to disk and import it.
+
+    Rows need an ``msisdn`` and may carry a ``name``. Contacts are added to
+    ``list_name``, which is created if missing. Uploads over
+    ``IMPORT_MAX_BYTES`` are rejected with 413. Returns a job id for
+    ``GET /api/imports/{job_id}``.
+    """
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "ndjson" in content_type else "csv"
+    f = await run_in_threadpool(
+        tempfile.NamedTemporaryFile, delete=False, suffix=f".{fmt}"
+    )
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > IMPORT_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="upload too large")
+            # Disk writes stay off the event loop.
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        f.close()
+        os.remove(f.name)
+        raise
+    f.close()
+    job_id = await run_in_threadpool(start_import, f.name, fmt, list_name)
+    return {"job_id": job_id}
+
+
+@app.get("/api/imports/{job_id}")
+def get_import(
+    job_id: str,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+) -> dict:
+    job = db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="not found")
+    return {
+        "id": job.id,
+        "status": job.status,
+        "format": job.format,
+        "list_name": job.list_name,
+        "list_id": job.list_id,
+        "rows": job.rows,
+        "imported": job.imported,
+        "invalid": job.invalid,
+        "seconds": job.seconds,
+        "rows_per_second": job.rows / job.seconds if job.seconds else 0.0,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
 @app.get("/api/contacts/{contact_id}", response_model=ContactOut)
 def get_contact(
     contact_id: int,
@@ -220,9 +803,9 @@ def update_contact(
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     obj.name = contact.name
+    log_audit(db, "contacts", obj.id, "update")
     db.commit()
     db.refresh(obj)
-    log_audit(db, "contacts", obj.id, "update")
     return obj
 
 
@@ -237,8 +820,8 @@ def delete_contact(
         raise HTTPException(status_code=404, detail="not found")
     record_id = obj.id
     db.delete(obj)
-    db.commit()
     log_audit(db, "contacts", record_id, "delete")
+    db.commit()
     return {"status": "deleted"}
 
 
@@ -255,12 +838,28 @@ class DeviceOut(DeviceIn):
         orm_mode = True
 
 
+DEVICE_COLUMNS = (Device.id, Device.name, Device.port, Device.active)
+
+
 @app.get("/api/devices", response_model=list[DeviceOut])
 def list_devices(
+    response: Response,
+    after_id: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    active: bool | None = None,
+    stream: bool = False,
     db: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    return db.query(Device).all()
+    """List devices by ascending id, one keyset page at a time."""
+    stmt = keyset(select(*DEVICE_COLUMNS), Device.id, after_id)
+    if active is not None:
+        stmt = stmt.where(Device.active.is_(active))
+    if stream:
+        return stream_ndjson(stmt)
+    rows = db.execute(stmt.limit(limit)).all()
+    set_next_cursor(response, rows, limit)
+    return rows
 
 
 @app.post("/api/devices", response_model=DeviceOut)
@@ -271,9 +870,10 @@ def create_device(
 ):
     obj = Device(**device.dict())
     db.add(obj)
+    db.flush()
+    log_audit(db, "devices", obj.id, "create")
     db.commit()
     db.refresh(obj)
-    log_audit(db, "devices", obj.id, "create")
     return obj
 
 
@@ -302,9 +902,9 @@ def update_device(
     obj.name = device.name
     obj.port = device.port
     obj.active = device.active
+    log_audit(db, "devices", obj.id, "update")
     db.commit()
     db.refresh(obj)
-    log_audit(db, "devices", obj.id, "update")
     return obj
 
 
@@ -319,11 +919,90 @@ def delete_device(
         raise HTTPException(status_code=404, detail="not found")
     record_id = obj.id
     db.delete(obj)
-    db.commit()
     log_audit(db, "devices", record_id, "delete")
+    db.commit()
     return {"status": "deleted"}
 
 
+class ListOut(BaseModel):
+    id: int
+    name: str
+    members: int
+
+
+class ListCombineIn(BaseModel):
+    name: str
+    operation: str = Field("union", pattern="^(union|intersection|difference)$")
+    list_ids: list[int] = Field(..., min_length=1)
+    exclude_opted_out: bool = False
+    exclude_messaged_days: float | None = Field(None, gt=0)
+
+
+@app.get("/api/lists", response_model=list[ListOut])
+def list_lists(
+    response: Response,
+    after_id: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """List lists with their member counts, one keyset page at a time."""
+    rows = db.execute(
+        keyset(select(List.id, List.name), List.id, after_id).limit(limit)
+    ).all()
+    set_next_cursor(response, rows, limit)
+    counts = member_counts(db, [row.id for row in rows])
+    return [ListOut(id=r.id, name=r.name, members=counts[r.id]) for r in rows]
+
+
+@app.get("/api/lists/{list_id}", response_model=ListOut)
+def get_list(
+    list_id: int,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    obj = db.get(List, list_id)
+    if not obj:
+        raise HTTPException(status_code=404, detail="not found")
+    return ListOut(id=obj.id, name=obj.name, members=member_count(db, obj.id))
+
+
+@app.post("/api/lists/combine", response_model=ListOut)
+def api_combine_lists(
+    data: ListCombineIn,
+    db: Session = Depends(get_session),
+    user: User = Depends(require_role("ops", "admin")),
+):
+    """Materialize a new list from a set operation over existing lists.
+
+    ``difference`` keeps members of the first list that are in none of the
+    others. Opted-out contacts and contacts messaged within
+    ``exclude_messaged_days`` can be left out.
+    """
+    found = set(db.scalars(select(List.id).where(List.id.in_(data.list_ids))))
+    missing = sorted(set(data.list_ids) - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"lists not found: {missing}")
+    since = None
+    if data.exclude_messaged_days is not None:
+        since = datetime.utcnow() - timedelta(days=data.exclude_messaged_days)
+    try:
+        obj, members = combine_lists(
+            db,
+            data.name,
+            data.operation,
+            data.list_ids,
+            exclude_opted_out=data.exclude_opted_out,
+            messaged_since=since,
+        )
+    except IntegrityError as exc:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="list name taken") from exc
+    log_audit(db, "lists", obj.id, "create")
+    db.commit()
+    return ListOut(id=obj.id, name=obj.name, members=members)
+
+
 class CampaignIn(BaseModel):
     name: str
     template: str
@@ -332,6 +1011,22 @@ class CampaignIn(BaseModel):
     window: str | None = None
     rate_limit: int = 1
 
+    @field_validator("window")
+    @classmethod
+    def _check_window(cls, window: str | None) -> str | None:
+        """Accept ``HH:MM-HH:MM`` (UTC) with the start before the end."""
+        if not window:
+            return None
+        start, sep, end = window.partition("-")
+        try:
+            opens = datetime.strptime(start, "%H:%M").time()
+            closes = datetime.strptime(end, "%H:%M").time()
+        except ValueError:
+            raise ValueError("window must be HH:MM-HH:MM") from None
+        if not sep or opens >= closes:
+            raise ValueError("window must start before it ends on the same day")
+        return window
+
 
 class CampaignOut(BaseModel):
     id: int
@@ -342,6 +1037,7 @@ class CampaignOut(BaseModel):
     window_start: str | None
     window_end: str | None
     rate_limit: int
+    status: str
     total: int
     sent: int
     delivered: int
@@ -362,28 +1058,41 @@ class AuditOut(BaseModel):
         orm_mode = True
 
 
+def _healthy_device(cycle: Iterator[Device], count: int) -> Device | None:
+    """Return the next device in ``cycle`` that is not cooling down."""
+    for _ in range(count):
+        device = next(cycle)
+        if healthy(device.port):
+            return device
+    return None
+
+
 def send_campaign(campaign_id: int) -> None:
+    """Send a campaign claimed by :func:`dispatch_due_campaigns`.
+
+    If this process loses ownership midway, or the send loop raises, the
+    campaign is handed back as ``scheduled`` for the next dispatch, which
+    skips contacts already sent to.
+    Failed sends are left to the retry queue instead of stopping the campaign,
+    and devices that keep failing are skipped while they cool down.
+    """
     db = SessionLocal()
     try:
         campaign = db.get(Campaign, campaign_id)
         if not campaign:
             return
-        contacts = (
-            db.query(Contact)
-            .join(ListMember, ListMember.contact_id == Contact.id)
-            .filter(ListMember.list_id == campaign.list_id, Contact.opt_out.is_(False))
-            .all()
-        )
         devices = db.query(Device).filter(Device.active.is_(True)).all()
         if not devices:
+            campaign.status = "done"
+            db.commit()
             return
         cycle = itertools.cycle(devices)
         last_sent: dict[int, float] = {d.id: 0.0 for d in devices}
-        seen: set[str] = set()
-        for contact in contacts:
-            if contact.msisdn in seen:
-                continue
-            seen.add(contact.msisdn)
+        for contact_id, msisdn in iter_recipients(db, campaign.list_id, campaign.id):
+            if OWNER_STOP.is_set():
+                campaign.status = "scheduled"
+                db.commit()
+                return
             if campaign.window_start and campaign.window_end:
                 ws = datetime.strptime(campaign.window_start, "%H:%M").time()
                 we = datetime.strptime(campaign.window_end, "%H:%M").time()
@@ -392,34 +1101,114 @@ def send_campaign(campaign_id: int) -> None:
                     target = datetime.combine(now.date(), ws)
                     if now.time() > we:
                         target += timedelta(days=1)
-                    time.sleep((target - now).total_seconds())
-            device = next(cycle)
+                    if OWNER_STOP.wait((target - now).total_seconds()):
+                        campaign.status = "scheduled"
+                        db.commit()
+                        return
+            device = _healthy_device(cycle, len(devices))
+            while device is None:
+                # Every modem is cooling down after repeated failures.
+                if OWNER_STOP.wait(cooldown_left(d.port for d in devices)):
+                    campaign.status = "scheduled"
+                    db.commit()
+                    return
+                device = _healthy_device(cycle, len(devices))
             wait = max(
                 0, last_sent[device.id] + 1.0 / campaign.rate_limit - time.time()
             )
             if wait:
                 time.sleep(wait)
-            refs = send_sms(contact.msisdn, campaign.template, device.port)
-            msg = Message(
-                campaign_id=campaign.id,
-                contact_id=contact.id,
-                device_id=device.id,
-                text=campaign.template,
-                ref=refs[0] if refs else None,
-                status="sent",
-            )
-            db.add(msg)
-            db.commit()
-            notify_status(
-                {
-                    "id": msg.id,
-                    "msisdn": contact.msisdn,
-                    "status": msg.status,
-                }
-            )
+            trace_id = new_trace_id()
+            with trace(trace_id), span("campaign_send", campaign=campaign.id):
+                msg = Message(
+                    campaign_id=campaign.id,
+                    contact_id=contact_id,
+                    device_id=device.id,
+                    text=campaign.template,
+                    status="sending",
+                    attempts=0,
+                    trace_id=trace_id,
+                )
+                db.add(msg)
+                try:
+                    refs = send_message(
+                        msisdn,
+                        campaign.template,
+                        device.port,
+                        lane=CAMPAIGN,
+                        flow=campaign.id,
+                        weight=campaign.rate_limit,
+                    )
+                except Exception as exc:
+                    logging.warning("campaign %s send failed: %s", campaign.id, exc)
+                    retried = record_failure(db, msg, exc)
+                else:
+                    retried = False
+                    msg.attempts = 1
+                    msg.ref = refs[0] if refs else None
+                    msg.status = "sent"
+                db.commit()
+                if retried:
+                    wake_outbound()
+                else:
+                    notify_status(
+                        {
+                            "id": msg.id,
+                            "msisdn": msisdn,
+                            "status": msg.status,
+                            "campaign_id": campaign.id,
+                            "device_id": device.id,
+                        }
+                    )
+                    release_held_report(db, msg, device.port)
             last_sent[device.id] = time.time()
+        campaign.status = "done"
+        db.commit()
+    except Exception:
+        logging.exception("campaign %s failed; rescheduling", campaign_id)
+        db.rollback()
+        # Hand the claim back so the next dispatch tick retries; contacts
+        # already sent to are skipped.
+        db.execute(
+            update(Campaign)
+            .where(Campaign.id == campaign_id, Campaign.status == "running")
+            .values(status="scheduled")
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def dispatch_due_campaigns() -> None:
+    """Start every scheduled campaign whose start time has passed.
+
+    Runs on the owner's scheduler, so campaigns created by any worker are
+    started exactly once.
+    """
+    db = SessionLocal()
+    try:
+        due = db.scalars(
+            update(Campaign)
+            .where(
+                Campaign.status == "scheduled",
+                Campaign.start_time <= datetime.utcnow(),
+            )
+            .values(status="running")
+            .returning(Campaign.id)
+        ).all()
+        db.commit()
     finally:
         db.close()
+    for campaign_id in due:
+        logging.info("starting campaign %s", campaign_id)
+        SCHEDULER.add_job(send_campaign, args=[campaign_id])
+
+
+def _parse_window(window: str | None) -> tuple[str | None, str | None]:
+    parts = window.split("-") if window else []
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    return None, None
 
 
 @app.post("/api/campaigns", response_model=CampaignOut)
@@ -428,11 +1217,7 @@ def create_campaign(
     db: Session = Depends(get_session),
     user: User = Depends(require_role("ops", "admin")),
 ):
-    window_start = window_end = None
-    if campaign.window:
-        parts = campaign.window.split("-")
-        if len(parts) == 2:
-            window_start, window_end = parts
+    window_start, window_end = _parse_window(campaign.window)
     obj = Campaign(
         name=campaign.name,
         template=campaign.template,
@@ -443,12 +1228,10 @@ def create_campaign(
         rate_limit=campaign.rate_limit,
     )
     db.add(obj)
+    db.flush()
+    log_audit(db, "campaigns", obj.id, "create")
     db.commit()
     db.refresh(obj)
-    log_audit(db, "campaigns", obj.id, "create")
-    SCHEDULER.add_job(
-        send_campaign, "date", run_date=campaign.start_time, args=[obj.id]
-    )
     total = db.query(ListMember).filter(ListMember.list_id == obj.list_id).count()
     return CampaignOut(
         id=obj.id,
@@ -459,6 +1242,7 @@ def create_campaign(
         window_start=obj.window_start,
         window_end=obj.window_end,
         rate_limit=obj.rate_limit,
+        status=obj.status,
         total=total,
         sent=0,
         delivered=0,
@@ -466,6 +1250,72 @@ def create_campaign(
     )
 
 
+class DeviceLoadOut(BaseModel):
+    device_id: int
+    port: str
+    healthy: bool
+    messages: int
+    segments: int
+    rate: float
+    seconds: float
+
+
+class CampaignPlanOut(BaseModel):
+    members: int
+    opted_out: int
+    already_sent: int
+    recipients: int
+    encoding: str
+    characters: int
+    segments_per_message: int
+    total_segments: int
+    devices: list[DeviceLoadOut]
+    start_time: datetime
+    send_seconds: float
+    estimated_finish: datetime | None
+
+
+@app.post("/api/campaigns/plan", response_model=CampaignPlanOut)
+def plan_new_campaign(
+    campaign: CampaignIn,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """Forecast a campaign without creating it."""
+    window_start, window_end = _parse_window(campaign.window)
+    return plan_campaign(
+        db,
+        campaign.template,
+        campaign.list_id,
+        campaign.start_time,
+        campaign.rate_limit,
+        window_start,
+        window_end,
+    )
+
+
+@app.get("/api/campaigns/{campaign_id}/plan", response_model=CampaignPlanOut)
+def plan_existing_campaign(
+    campaign_id: int,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """Forecast the rest of a campaign, leaving out contacts already sent to."""
+    campaign = db.get(Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="not found")
+    return plan_campaign(
+        db,
+        campaign.template,
+        campaign.list_id,
+        campaign.start_time,
+        campaign.rate_limit,
+        campaign.window_start,
+        campaign.window_end,
+        campaign_id=campaign.id,
+    )
+
+
 @app.get("/api/campaigns/{campaign_id}", response_model=CampaignOut)
 def get_campaign(
     campaign_id: int,
@@ -496,6 +1346,7 @@ def get_campaign(
         window_start=campaign.window_start,
         window_end=campaign.window_end,
         rate_limit=campaign.rate_limit,
+        status=campaign.status,
         total=total,
         sent=sent,
         delivered=delivered,
@@ -503,14 +1354,48 @@ def get_campaign(
     )
 
 
+AUDIT_COLUMNS = (
+    Audit.id,
+    Audit.table_name,
+    Audit.record_id,
+    Audit.action,
+    Audit.timestamp,
+)
+
+
 @app.get("/api/audit", response_model=list[AuditOut])
 def list_audit(
+    response: Response,
+    after_id: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    table_name: str | None = None,
+    record_id: int | None = None,
+    action: str | None = None,
+    since: datetime | None = None,
+    stream: bool = False,
     db: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    return db.query(Audit).order_by(Audit.timestamp.desc()).all()
-
-
-@app.get("/api/inbox")
+    """List audit records newest first, one keyset page at a time.
+
+    Ids grow with time, so ``after_id`` continues with older records.
+    """
+    stmt = keyset(select(*AUDIT_COLUMNS), Audit.id, after_id, descending=True)
+    if table_name:
+        stmt = stmt.where(Audit.table_name == table_name)
+    if record_id is not None:
+        stmt = stmt.where(Audit.record_id == record_id)
+    if action:
+        stmt = stmt.where(Audit.action == action)
+    if since is not None:
+        stmt = stmt.where(Audit.timestamp >= since)
+    if stream:
+        return stream_ndjson(stmt)
+    rows = db.execute(stmt.limit(limit)).all()
+    set_next_cursor(response, rows, limit)
+    return rows
+
+
+@app.get("/api/inbox", dependencies=[Depends(require_owner)])
 def api_inbox(user: User = Depends(get_current_user)) -> list[dict]:
     return INBOX
@@ -1,42 +1,428 @@
 """Maintenance tasks such as backups and data retention."""
 
+import glob
+import gzip
+import json
 import logging
 import os
 import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
 from datetime import datetime, timedelta
+from typing import Callable
 
-from backend.db import DATABASE_URL, SessionLocal
-from backend.models import Audit, Message
+from sqlalchemy import delete, select, text
+from sqlalchemy.engine import URL, make_url
+
+from backend.db import IS_SQLITE, SQLCIPHER_KEY, engine
+from backend.models import Audit, ImportJob, Message
+from backend.utils import json_default
 
 BACKUP_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backups")
+ARCHIVE_DIR = os.path.join(BACKUP_DIR, "archive")
+
+MESSAGE_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", "90"))
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "365"))
+IMPORT_JOB_RETENTION_DAYS = int(os.getenv("IMPORT_JOB_RETENTION_DAYS", "7"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "2000"))
+RETENTION_PAUSE = float(os.getenv("RETENTION_PAUSE", "0.05"))
+RETENTION_ARCHIVE = os.getenv("RETENTION_ARCHIVE", "0") == "1"
+VACUUM_STEP_PAGES = int(os.getenv("VACUUM_STEP_PAGES", "1000"))
+
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_STEP_PAGES = int(os.getenv("BACKUP_STEP_PAGES", "256"))
+BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "0.005"))
+BACKUP_INCREMENTAL = os.getenv("BACKUP_INCREMENTAL", "0") == "1"
+BACKUP_FULL_INTERVAL_DAYS = int(os.getenv("BACKUP_FULL_INTERVAL_DAYS", "7"))
+COPY_CHUNK_SIZE = 1 << 20
+DELTA_MAGIC = b"MUXODLT1"
+
+Progress = Callable[[str, int], None]
+
+
+def _snapshot(target: str) -> None:
+    """Copy the live database to ``target`` with SQLite's online backup API.
+
+    Pages are copied ``BACKUP_STEP_PAGES`` at a time with a short sleep in
+    between, so concurrent writers only ever wait for a single step.
+    """
+    raw = engine.raw_connection()
+    try:
+        dest = engine.dialect.dbapi.connect(target)
+        try:
+            if SQLCIPHER_KEY:
+                dest.execute(f"PRAGMA key='{SQLCIPHER_KEY}';")
+            raw.driver_connection.backup(
+                dest, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP
+            )
+        finally:
+            dest.close()
+    finally:
+        raw.close()
+
+
+def _page_size(path: str) -> int:
+    with open(path, "rb") as f:
+        header = f.read(18)
+    size = int.from_bytes(header[16:18], "big") if len(header) == 18 else 0
+    # 1 encodes 65536; encrypted files have no readable header.
+    return 65536 if size == 1 else size or 4096
+
+
+def _compress(source: str, target: str) -> None:
+    with open(source, "rb") as src, gzip.open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+
+def _write_delta(base: str, snapshot: str, target: str) -> int:
+    """Store the pages of ``snapshot`` that differ from the full backup ``base``.
+
+    Returns the number of changed pages written.
+    """
+    page_size = _page_size(snapshot)
+    page_count = os.path.getsize(snapshot) // page_size
+    base_name = os.path.basename(base).encode()
+    changed = 0
+    with (
+        gzip.open(base, "rb") as old,
+        open(snapshot, "rb") as new,
+        gzip.open(target, "wb") as out,
+    ):
+        out.write(DELTA_MAGIC)
+        out.write(struct.pack(">IIH", page_size, page_count, len(base_name)))
+        out.write(base_name)
+        for page_no in range(page_count):
+            page = new.read(page_size)
+            if old.read(page_size) != page:
+                out.write(struct.pack(">I", page_no) + page)
+                changed += 1
+    return changed
+
+
+def _read_delta_header(f) -> tuple[int, int, str]:
+    if f.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+        raise ValueError("not a muxo delta backup")
+    page_size, page_count, name_len = struct.unpack(">IIH", f.read(10))
+    return page_size, page_count, f.read(name_len).decode()
+
+
+def _delta_base(path: str) -> str:
+    with gzip.open(path, "rb") as f:
+        return _read_delta_header(f)[2]
+
+
+def _full_backups() -> list[str]:
+    paths: list[str] = []
+    for pattern in ("muxo-*.db", "muxo-*.db.gz", "muxo-*.dump"):
+        paths += glob.glob(os.path.join(BACKUP_DIR, pattern))
+    return sorted(paths)
+
+
+def _libpq_args(url: str | URL) -> tuple[str, dict[str, str]]:
+    """Return a libpq URL without the password and the environment to run with.
+
+    The password goes in ``PGPASSWORD`` so ``ps`` never shows it in argv.
+    """
+    url = make_url(url)
+    env = dict(os.environ)
+    if url.password is not None:
+        env["PGPASSWORD"] = str(url.password)
+    dsn = URL.create(
+        "postgresql",
+        username=url.username,
+        host=url.host,
+        port=url.port,
+        database=url.database,
+        query=url.query,
+    )
+    return dsn.render_as_string(), env
+
+
+def _pg_dump(target: str) -> None:
+    """Dump a PostgreSQL database in pg_dump's compressed custom format.
+
+    pg_dump reads from one MVCC snapshot, so writers are never blocked.
+    """
+    dsn, env = _libpq_args(engine.url)
+    subprocess.run(
+        ["pg_dump", "--format=custom", f"--file={target}", dsn], check=True, env=env
+    )
+
 
+def rotate_backups(keep: int = BACKUP_KEEP) -> list[str]:
+    """Delete all but the newest ``keep`` full backups and orphaned deltas.
 
-def backup_db() -> str:
+    A ``keep`` of 0 disables rotation.
+    """
+    removed = _full_backups()[:-keep] if keep else []
+    for path in removed:
+        os.remove(path)
+    remaining = {os.path.basename(p) for p in _full_backups()}
+    for path in glob.glob(os.path.join(BACKUP_DIR, "muxo-*.delta.gz")):
+        if _delta_base(path) not in remaining:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def _latest_compressed_full() -> str | None:
+    fulls = [p for p in _full_backups() if p.endswith(".db.gz")]
+    if not fulls:
+        return None
+    latest = fulls[-1]
+    age = time.time() - os.path.getmtime(latest)
+    if age > BACKUP_FULL_INTERVAL_DAYS * 86400:
+        return None
+    return latest
+
+
+def backup_db(incremental: bool = BACKUP_INCREMENTAL) -> str:
+    """Write a consistent, gzip-compressed backup and rotate old ones.
+
+    With ``incremental`` only the pages changed since the latest full backup
+    are stored, as long as that full backup is younger than
+    ``BACKUP_FULL_INTERVAL_DAYS``. PostgreSQL databases are always dumped in
+    full with ``pg_dump``.
+    """
     os.makedirs(BACKUP_DIR, exist_ok=True)
     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    db_path = DATABASE_URL.replace("sqlite:///", "")
-    target = os.path.join(BACKUP_DIR, f"muxo-{timestamp}.db")
-    shutil.copy(db_path, target)
+    if not IS_SQLITE:
+        target = os.path.join(BACKUP_DIR, f"muxo-{timestamp}.dump")
+        _pg_dump(target)
+        rotate_backups()
+        return target
+    snapshot = os.path.join(BACKUP_DIR, f".muxo-{timestamp}.snapshot")
+    try:
+        _snapshot(snapshot)
+        base = _latest_compressed_full() if incremental else None
+        if base:
+            target = os.path.join(BACKUP_DIR, f"muxo-{timestamp}.delta.gz")
+            pages = _write_delta(base, snapshot, target)
+            logging.info("incremental backup: %d changed pages since %s", pages, base)
+        else:
+            target = os.path.join(BACKUP_DIR, f"muxo-{timestamp}.db.gz")
+            _compress(snapshot, target)
+    finally:
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+    rotate_backups()
     return target
 
 
-def purge_old_data() -> None:
-    db = SessionLocal()
-    try:
-        msg_cutoff = datetime.utcnow() - timedelta(days=90)
-        db.query(Message).filter(Message.created_at < msg_cutoff).delete()
-        audit_cutoff = datetime.utcnow() - timedelta(days=365)
-        db.query(Audit).filter(Audit.timestamp < audit_cutoff).delete()
-        db.commit()
-    finally:
-        db.close()
+def restore_backup(path: str, target: str) -> None:
+    """Rebuild a database file at ``target`` from a full or delta backup.
+
+    For ``pg_dump`` backups ``target`` is a PostgreSQL connection URL. The
+    application must not be using ``target`` while it is replaced.
+    """
+    if path.endswith(".dump"):
+        dsn, env = _libpq_args(target)
+        subprocess.run(
+            ["pg_restore", "--clean", "--if-exists", f"--dbname={dsn}", path],
+            check=True,
+            env=env,
+        )
+        return
+    tmp = target + ".restoring"
+    if path.endswith(".delta.gz"):
+        with gzip.open(path, "rb") as delta:
+            page_size, page_count, base_name = _read_delta_header(delta)
+            restore_backup(os.path.join(os.path.dirname(path), base_name), tmp)
+            with open(tmp, "r+b") as out:
+                record = struct.calcsize(">I") + page_size
+                while chunk := delta.read(record):
+                    (page_no,) = struct.unpack(">I", chunk[:4])
+                    out.seek(page_no * page_size)
+                    out.write(chunk[4:])
+                out.truncate(page_count * page_size)
+    elif path.endswith(".gz"):
+        with gzip.open(path, "rb") as src, open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+    else:
+        shutil.copyfile(path, tmp)
+    os.replace(tmp, target)
+
+
+def verify_backup(path: str) -> dict[str, object]:
+    """Restore ``path`` into a scratch file and run an integrity check.
+
+    Returns the outcome together with restore and check timings in seconds.
+    ``pg_dump`` backups are only checked for a readable table of contents.
+    """
+    if path.endswith(".dump"):
+        start = time.perf_counter()
+        listing = subprocess.run(
+            ["pg_restore", "--list", path], capture_output=True, check=False
+        )
+        return {
+            "path": path,
+            "ok": listing.returncode == 0,
+            "restore_seconds": 0.0,
+            "check_seconds": time.perf_counter() - start,
+        }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = os.path.join(tmpdir, "verify.db")
+        start = time.perf_counter()
+        restore_backup(path, target)
+        restored = time.perf_counter()
+        conn = engine.dialect.dbapi.connect(target)
+        try:
+            if SQLCIPHER_KEY:
+                conn.execute(f"PRAGMA key='{SQLCIPHER_KEY}';")
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            conn.close()
+        checked = time.perf_counter()
+    return {
+        "path": path,
+        "ok": result == "ok",
+        "restore_seconds": restored - start,
+        "check_seconds": checked - restored,
+    }
+
+
+def _archive_rows(table: str, column: str, rows: list[dict]) -> None:
+    """Append rows to gzip files named after the month of ``column``."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    by_month: dict[str, list[dict]] = {}
+    for row in rows:
+        by_month.setdefault(row[column].strftime("%Y-%m"), []).append(row)
+    for month, month_rows in by_month.items():
+        path = os.path.join(ARCHIVE_DIR, f"{table}-{month}.ndjson.gz")
+        # Each append adds a gzip member; readers see one continuous stream.
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in month_rows:
+                f.write(json.dumps(row, default=json_default) + "\n")
+
+
+def purge_table(
+    model,
+    column,
+    cutoff: datetime,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_PAUSE,
+    archive: bool = RETENTION_ARCHIVE,
+    progress: Progress | None = None,
+) -> int:
+    """Delete rows older than ``cutoff`` in primary-key batches.
+
+    Each batch is its own short transaction and the job sleeps ``pause``
+    seconds between batches, so writers are never locked out for long.
+    Returns the number of rows deleted.
+    """
+    table = model.__table__
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            if archive:
+                rows = [
+                    dict(row)
+                    for row in conn.execute(
+                        select(table)
+                        .where(column < cutoff)
+                        .order_by(table.c.id)
+                        .limit(batch_size)
+                    ).mappings()
+                ]
+                ids = [row["id"] for row in rows]
+                if rows:
+                    _archive_rows(table.name, column.key, rows)
+            else:
+                ids = list(
+                    conn.scalars(
+                        select(table.c.id)
+                        .where(column < cutoff)
+                        .order_by(table.c.id)
+                        .limit(batch_size)
+                    )
+                )
+            if ids:
+                conn.execute(delete(table).where(table.c.id.in_(ids)))
+        deleted += len(ids)
+        if ids and progress:
+            progress(table.name, deleted)
+        if len(ids) < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def incremental_vacuum(
+    step_pages: int = VACUUM_STEP_PAGES, pause: float = RETENTION_PAUSE
+) -> int:
+    """Return free SQLite pages to the filesystem a few at a time.
+
+    Only effective when the database uses ``auto_vacuum=INCREMENTAL``; see
+    ``enable_incremental_vacuum``. Returns the number of pages released.
+    """
+    if not IS_SQLITE:
+        return 0
+    released = 0
+    with engine.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            logging.info("auto_vacuum is not incremental; skipping vacuum")
+            return 0
+        conn.commit()
+        raw = conn.connection.driver_connection
+        while True:
+            free = raw.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                return released
+            # executescript steps the pragma to completion; a plain execute
+            # would release a single page.
+            raw.executescript(f"PRAGMA incremental_vacuum({min(free, step_pages)});")
+            remaining = raw.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free:
+                return released
+            released += free - remaining
+            time.sleep(pause)
+
+
+def enable_incremental_vacuum() -> None:
+    """Switch an existing SQLite database to incremental auto-vacuum.
+
+    This rewrites the whole file with a full ``VACUUM``; run it once during
+    a maintenance window.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+        conn.execute(text("VACUUM"))
+
+
+def _log_progress(table: str, deleted: int) -> None:
+    logging.info("retention: %d rows purged from %s", deleted, table)
+
+
+def purge_old_data(progress: Progress | None = _log_progress) -> dict[str, int]:
+    now = datetime.utcnow()
+    msg_cutoff = now - timedelta(days=MESSAGE_RETENTION_DAYS)
+    audit_cutoff = now - timedelta(days=AUDIT_RETENTION_DAYS)
+    import_cutoff = now - timedelta(days=IMPORT_JOB_RETENTION_DAYS)
+    result = {
+        "messages": purge_table(
+            Message, Message.created_at, msg_cutoff, progress=progress
+        ),
+        "audit": purge_table(Audit, Audit.timestamp, audit_cutoff, progress=progress),
+        "import_jobs": purge_table(
+            ImportJob, ImportJob.finished_at, import_cutoff, progress=progress
+        ),
+    }
+    result["vacuumed_pages"] = incremental_vacuum()
+    return result
 
 
 def nightly_backup() -> None:
     path = backup_db()
-    purge_old_data()
-    logging.info("nightly backup saved to %s", path)
+    purged = purge_old_data()
+    logging.info("nightly backup saved to %s, purged %s", path, purged)
 
 
 if __name__ == "__main__":
-    nightly_backup()
+    if sys.argv[1:2] == ["restore"]:
+        restore_backup(sys.argv[2], sys.argv[3])
+    elif sys.argv[1:2] == ["verify"]:
+        print(verify_backup(sys.argv[2]))
+    else:
+        nightly_backup()
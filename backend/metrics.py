@@ -0,0 +1,241 @@
+"""Prometheus-style metrics for the SMS pipeline.
+
+Updates are lock-free: every thread writes to its own shard of each metric
+and shards are only summed when ``/metrics`` is scraped. Shards of threads
+that have exited are folded into one retired total, so short-lived webhook,
+import and campaign threads do not pile up. Values that live elsewhere,
+such as queue depths, are read at scrape time by collectors.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_METRICS: list[_Metric] = []
+_COLLECTORS: list[Callable[[], Iterator[str]]] = []
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: list[tuple[weakref.ref, dict]] = []
+        # Totals of the shards of exited threads; replaced, never mutated.
+        self._retired: dict = {}
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._reap()
+                self._shards.append((weakref.ref(threading.current_thread()), values))
+            return values
+
+    def _reap(self) -> None:
+        # Called with the lock held. An exited thread never writes again, so
+        # its shard can be folded into the retired totals.
+        live = []
+        retired = dict(self._retired)
+        for ref, shard in self._shards:
+            thread = ref()
+            if thread is not None and thread.is_alive():
+                live.append((ref, shard))
+            else:
+                for key, value in shard.items():
+                    retired[key] = self._add(retired.get(key), value)
+        self._shards = live
+        self._retired = retired
+
+    def _add(self, total, value):
+        raise NotImplementedError
+
+    def _snapshots(self) -> list[dict]:
+        with self._lock:
+            self._reap()
+            shards = [shard for _, shard in self._shards]
+            retired = self._retired
+        # dict.copy() is atomic, so owners can keep writing meanwhile.
+        return [retired] + [shard.copy() for shard in shards]
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        values = self._shard()
+        values[labels] = values.get(labels, 0.0) + amount
+
+    def _add(self, total: float | None, value: float) -> float:
+        return (total or 0.0) + value
+
+    def _samples(self) -> Iterator[str]:
+        totals: dict[tuple, float] = {}
+        for shard in self._snapshots():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        for key, value in sorted(totals.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels) -> None:
+        values = self._shard()
+        state = values.get(labels)
+        if state is None:
+            # Per-bucket counts (the last one is +Inf), then the sum.
+            state = values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _add(self, total: list | None, state: list) -> list:
+        if total is None:
+            return list(state)
+        return [a + b for a, b in zip(total, state)]
+
+    @contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _samples(self) -> Iterator[str]:
+        totals: dict[tuple, list] = {}
+        for shard in self._snapshots():
+            for key, state in shard.items():
+                state = list(state)
+                total = totals.setdefault(key, [0] * len(state))
+                for i, value in enumerate(state):
+                    total[i] += value
+        bounds = self.buckets + (math.inf,)
+        for key, total in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, total):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                labels = _labels(self.labelnames, key, le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_number(total[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def gauge_family(
+    name: str, help: str, labelnames: tuple[str, ...] = ()
+) -> Callable[[dict[tuple, float]], Iterator[str]]:
+    """Return a renderer for gauge values computed by a collector."""
+
+    def render(values: dict[tuple, float]) -> Iterator[str]:
+        yield f"# HELP {name} {help}"
+        yield f"# TYPE {name} gauge"
+        for key, value in sorted(values.items()):
+            yield f"{name}{_labels(labelnames, key)} {_number(value)}"
+
+    return render
+
+
+def register_collector(collector: Callable[[], Iterator[str]]) -> None:
+    """Add a callable yielding exposition lines on every scrape."""
+    _COLLECTORS.append(collector)
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collector in _COLLECTORS:
+        try:
+            lines.extend(collector())
+        except Exception as exc:  # pragma: no cover - best effort
+            lines.append(f"# collector {collector.__name__} failed: {exc}")
+    return "\n".join(lines) + "\n"
+
+
+AT_LATENCY = Histogram(
+    "muxo_at_command_seconds",
+    "Round trip of AT commands to a modem.",
+    ("device", "command"),
+)
+MESSAGES_SENT = Counter(
+    "muxo_messages_sent_total", "Messages accepted by a modem.", ("device",)
+)
+MESSAGES_FAILED = Counter(
+    "muxo_messages_failed_total", "Messages a modem rejected.", ("device",)
+)
+SEGMENTS = Histogram(
+    "muxo_message_segments",
+    "Segments per submitted message.",
+    buckets=(1, 2, 3, 4, 6, 8, 10),
+)
+CMS_ERRORS = Counter(
+    "muxo_cms_errors_total", "+CMS ERROR results by code.", ("device", "code")
+)
+DLRS = Counter("muxo_dlr_total", "Delivery reports received.", ("status",))
+INBOUND = Counter("muxo_inbound_total", "Inbound messages received.", ("device",))
+DB_COMMIT = Histogram("muxo_db_commit_seconds", "Duration of session commits.")
+SEND_RETRIES = Counter(
+    "muxo_send_retries_total",
+    "Failed submissions by whether they were retried or given up.",
+    ("outcome",),
+)
+LANE_WAIT = Histogram(
+    "muxo_lane_wait_seconds", "Time sends waited for their device turn.", ("lane",)
+)
+WEBHOOK_LATENCY = Histogram(
+    "muxo_webhook_seconds", "Duration of status webhook posts.", ("outcome",)
+)
@@ -4,7 +4,17 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.orm import relationship
 
 from .db import Base
@@ -54,6 +64,7 @@ class Campaign(Base):
     window_start = Column(String)
     window_end = Column(String)
     rate_limit = Column(Integer, nullable=False, default=1)
+    status = Column(String, nullable=False, default="scheduled")
 
     messages = relationship("Message", back_populates="campaign")
 
@@ -71,6 +82,11 @@ class Device(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_status_id", "status", "id"),
+        Index("ix_messages_campaign_contact", "campaign_id", "contact_id"),
+        Index("ix_messages_contact_created", "contact_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     campaign_id = Column(Integer, ForeignKey("campaigns.id"))
@@ -80,7 +96,10 @@ class Message(Base):
     ref = Column(String)
     status = Column(String, default="queued", nullable=False)
     error_code = Column(String)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    trace_id = Column(String)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
     )
@@ -114,5 +133,41 @@ class Audit(Base):
     table_name = Column(String, nullable=False)
     record_id = Column(Integer, nullable=False)
     action = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class ApiKey(Base):
+    __tablename__ = "api_keys"
 
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    key_id = Column(String, unique=True, nullable=False)
+    key_hash = Column(String, nullable=False)
+    role = Column(String, nullable=False, default="viewer")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    revoked_at = Column(DateTime)
+
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="queued")
+    format = Column(String, nullable=False)
+    list_name = Column(String)
+    list_id = Column(Integer, ForeignKey("lists.id"))
+    rows = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    invalid = Column(Integer, nullable=False, default=0)
+    seconds = Column(Float, nullable=False, default=0.0)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, index=True)
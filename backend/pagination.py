@@ -0,0 +1,59 @@
+"""Keyset pagination and NDJSON streaming helpers for list endpoints."""
+
+from __future__ import annotations
+
+import json
+from typing import Iterator
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from backend.db import engine
+from backend.utils import json_default
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-After-Id"
+
+
+def keyset(stmt: Select, column, after_id: int | None, descending: bool = False):
+    """Order ``stmt`` by ``column`` and skip everything up to ``after_id``.
+
+    ``after_id`` is the last id the client has seen, so for descending
+    listings the page continues with smaller ids.
+    """
+    if descending:
+        if after_id is not None:
+            stmt = stmt.where(column < after_id)
+        return stmt.order_by(column.desc())
+    if after_id is not None:
+        stmt = stmt.where(column > after_id)
+    return stmt.order_by(column)
+
+
+def set_next_cursor(response: Response, rows: list, limit: int) -> None:
+    """Expose the cursor for the next page when the current one is full."""
+    if rows and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].id)
+
+
+def _iter_ndjson(stmt: Select) -> Iterator[bytes]:
+    # Own connection: the request session may already be closed while the
+    # response body is still being sent.
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=STREAM_CHUNK_SIZE).execute(stmt)
+        for partition in result.mappings().partitions():
+            yield "".join(
+                json.dumps(dict(row), default=json_default) + "\n" for row in partition
+            ).encode()
+
+
+def stream_ndjson(stmt: Select) -> StreamingResponse:
+    """Stream the rows of a column-level ``select`` as newline-delimited JSON.
+
+    Rows are fetched ``STREAM_CHUNK_SIZE`` at a time without building ORM
+    objects, so memory use does not depend on the size of the table.
+    """
+    return StreamingResponse(_iter_ndjson(stmt), media_type="application/x-ndjson")
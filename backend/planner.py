@@ -0,0 +1,168 @@
+"""Dry-run planning of campaigns.
+
+Counts recipients with one aggregate query, sizes the message from the
+cached segmentation of its template and spreads the load over the active
+devices the way :func:`backend.main.send_campaign` does. The finish time
+assumes each device sends at the campaign's rate limit or, when lower, at
+the device's current adaptive rate, and only inside the send window.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import UTC, datetime, time, timedelta
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+
+from backend.devices import ratecontrol
+from backend.models import Contact, Device, ListMember, Message
+from backend.sms.pdu import segment_info
+from backend.sms.retry import healthy
+
+
+def count_recipients(
+    db: Session, list_id: int, campaign_id: int | None = None
+) -> dict[str, int]:
+    """Count list members, opted-out ones and those a campaign already sent to.
+
+    ``recipients`` is what is left to send to, one per distinct number.
+    """
+    eligible = Contact.opt_out.is_(False)
+    already_sent = literal(0)
+    sent = None
+    if campaign_id is not None:
+        sent = (
+            select(Message.contact_id)
+            .where(Message.campaign_id == campaign_id)
+            .distinct()
+            .subquery()
+        )
+        eligible = eligible & sent.c.contact_id.is_(None)
+        already_sent = func.count(sent.c.contact_id)
+    stmt = (
+        select(
+            func.count().label("members"),
+            func.count(case((Contact.opt_out.is_(True), 1))).label("opted_out"),
+            already_sent.label("already_sent"),
+            func.count(func.distinct(case((eligible, Contact.msisdn)))).label(
+                "recipients"
+            ),
+        )
+        .select_from(ListMember)
+        .join(Contact, Contact.id == ListMember.contact_id)
+        .where(ListMember.list_id == list_id)
+    )
+    if sent is not None:
+        stmt = stmt.outerjoin(sent, sent.c.contact_id == Contact.id)
+    row = db.execute(stmt).one()
+    return dict(row._mapping)
+
+
+def _device_rate(port: str, rate_limit: int, segments: int) -> float:
+    """Messages per second one device is expected to manage."""
+    rate = float(rate_limit)
+    if ratecontrol.ADAPTIVE_RATE:
+        current = ratecontrol.rates().get(port, ratecontrol.DEVICE_START_RATE)
+        rate = min(rate, current / segments)
+    return rate
+
+
+def finish_time(
+    start: datetime,
+    seconds: float,
+    window_start: str | None = None,
+    window_end: str | None = None,
+) -> datetime | None:
+    """When ``seconds`` of sending that starts at ``start`` ends.
+
+    Sending only happens between ``window_start`` and ``window_end`` (UTC
+    ``HH:MM``) on each day, as in ``send_campaign``. Returns ``None`` when
+    that never happens: the window is empty or the end is out of range.
+    """
+    if not (window_start and window_end):
+        return start + timedelta(seconds=seconds)
+    ws = datetime.strptime(window_start, "%H:%M").time()
+    we = datetime.strptime(window_end, "%H:%M").time()
+    if ws >= we:
+        return None
+    daily = (
+        datetime.combine(start.date(), we) - datetime.combine(start.date(), ws)
+    ).total_seconds() + 60
+    try:
+        day = start.date()
+        now = start
+        remaining = seconds
+        # At most the rest of the first day, the whole days and the last one.
+        while True:
+            opens = datetime.combine(day, ws)
+            closes = datetime.combine(day, we) + timedelta(minutes=1)
+            now = max(now, opens)
+            if now < closes:
+                available = (closes - now).total_seconds()
+                if remaining <= available:
+                    return now + timedelta(seconds=remaining)
+                remaining -= available
+                whole_days = max(0, math.ceil(remaining / daily) - 1)
+                remaining -= whole_days * daily
+                day += timedelta(days=whole_days)
+            day += timedelta(days=1)
+            now = datetime.combine(day, time.min)
+    except OverflowError:
+        return None
+
+
+def plan_campaign(
+    db: Session,
+    template: str,
+    list_id: int,
+    start_time: datetime,
+    rate_limit: int,
+    window_start: str | None = None,
+    window_end: str | None = None,
+    campaign_id: int | None = None,
+) -> dict[str, object]:
+    """Forecast recipients, segments, per-device load and finish time."""
+    counts = count_recipients(db, list_id, campaign_id)
+    recipients = counts["recipients"]
+    encoding, segments = segment_info(template)
+    devices = db.execute(
+        select(Device.id, Device.port)
+        .where(Device.active.is_(True))
+        .order_by(Device.id)
+    ).all()
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(UTC).replace(tzinfo=None)
+    start = max(start_time, datetime.utcnow())
+    loads = []
+    seconds = 0.0
+    for index, (device_id, port) in enumerate(devices):
+        # send_campaign takes the devices in turn.
+        messages = recipients // len(devices) + (index < recipients % len(devices))
+        rate = _device_rate(port, rate_limit, segments)
+        device_seconds = messages / rate if rate > 0 else 0.0
+        seconds = max(seconds, device_seconds)
+        loads.append(
+            {
+                "device_id": device_id,
+                "port": port,
+                "healthy": healthy(port),
+                "messages": messages,
+                "segments": messages * segments,
+                "rate": rate,
+                "seconds": device_seconds,
+            }
+        )
+    return {
+        **counts,
+        "encoding": encoding,
+        "characters": len(template),
+        "segments_per_message": segments,
+        "total_segments": recipients * segments,
+        "devices": loads,
+        "start_time": start,
+        "send_seconds": seconds,
+        "estimated_finish": (
+            finish_time(start, seconds, window_start, window_end) if devices else None
+        ),
+    }
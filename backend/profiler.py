@@ -0,0 +1,71 @@
+"""On-demand sampling profiler.
+
+Samples the stacks of every thread at a fixed interval for a bounded time
+and aggregates them in the collapsed format (``frame;frame;frame count``)
+read by flamegraph.pl, speedscope and similar tools. Nothing runs between
+profiles.
+"""
+
+from __future__ import annotations
+
+import collections
+import os
+import sys
+import threading
+import time
+
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+_RUNNING = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}"
+
+
+def _stack(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample(
+    seconds: float, interval: float = PROFILE_INTERVAL
+) -> collections.Counter[str]:
+    """Sample all other threads for ``seconds`` and count collapsed stacks.
+
+    Only one profile runs at a time; a concurrent call raises
+    :class:`ProfilerBusy`.
+    """
+    if not _RUNNING.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        stacks: collections.Counter[str] = collections.Counter()
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                thread = names.get(ident) or str(ident)
+                stacks[f"{thread};{_stack(frame)}"] += 1
+            time.sleep(interval)
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+        return stacks
+    finally:
+        _RUNNING.release()
+
+
+def collapsed(stacks: collections.Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,185 @@
+"""Database-backed outbound message queue and the worker draining it."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from backend.db import SessionLocal
+from backend.devices.agents import send_many
+from backend.devices.lanes import CAMPAIGN, TRANSACTIONAL
+from backend.models import Message
+from backend.sms.receiver import release_held_report
+from backend.sms.retry import record_failure
+from backend.tracing import span, trace
+from backend.utils import notify_status
+
+OUTBOUND_BATCH_SIZE = int(os.getenv("OUTBOUND_BATCH_SIZE", "50"))
+OUTBOUND_POLL_INTERVAL = float(os.getenv("OUTBOUND_POLL_INTERVAL", "1.0"))
+# Claimed messages untouched for this long were abandoned by their sender.
+SENDING_TIMEOUT = float(os.getenv("SENDING_TIMEOUT", "300"))
+
+_WAKE = threading.Event()
+
+
+def claim_queued(
+    db: Session, limit: int = 100, device_id: int | None = None
+) -> list[Message]:
+    """Move up to ``limit`` queued messages to ``sending`` and return them.
+
+    On PostgreSQL rows already locked by another claimer are skipped
+    (``FOR UPDATE SKIP LOCKED``), so several senders can drain the queue
+    without blocking each other. SQLite serializes writers and the status
+    guard on the update keeps a message from being claimed twice. Retries
+    are only claimed once their ``next_attempt_at`` has passed.
+    """
+    due = or_(
+        Message.next_attempt_at.is_(None),
+        Message.next_attempt_at <= datetime.utcnow(),
+    )
+    stmt = (
+        select(Message.id)
+        .where(Message.status == "queued", due)
+        .order_by(Message.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    if device_id is not None:
+        stmt = stmt.where(Message.device_id == device_id)
+    ids = db.scalars(stmt).all()
+    if not ids:
+        db.rollback()
+        return []
+    claimed = db.scalars(
+        update(Message)
+        .where(Message.id.in_(ids), Message.status == "queued")
+        .values(status="sending", updated_at=datetime.utcnow())
+        .returning(Message.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    if not claimed:
+        return []
+    return (
+        db.query(Message)
+        .options(joinedload(Message.contact), joinedload(Message.device))
+        .filter(Message.id.in_(claimed))
+        .order_by(Message.id)
+        .all()
+    )
+
+
+def requeue_stale(db: Session, timeout: float = SENDING_TIMEOUT) -> int:
+    """Put messages stuck in ``sending`` for ``timeout`` seconds back in the queue.
+
+    A sender that died or lost the lease between claiming messages and
+    recording the outcome leaves them behind. They may have gone out, so a
+    recipient can get such a message twice.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    result = db.execute(
+        update(Message)
+        .where(Message.status == "sending", Message.updated_at < cutoff)
+        .values(status="queued", next_attempt_at=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount:
+        logging.warning("requeued %s abandoned messages", result.rowcount)
+    return result.rowcount
+
+
+def _record(db: Session, msg: Message, result: list[str] | Exception) -> None:
+    if isinstance(result, Exception):
+        logging.warning("send of message %s failed: %s", msg.id, result)
+        if record_failure(db, msg, result):
+            db.commit()
+            return
+    else:
+        msg.attempts += 1
+        msg.status = "sent"
+        msg.ref = result[0] if result else None
+        msg.next_attempt_at = None
+    db.commit()
+    notify_status(
+        {
+            "id": msg.id,
+            "msisdn": msg.contact.msisdn,
+            "status": msg.status,
+            "campaign_id": msg.campaign_id,
+            "device_id": msg.device_id,
+        }
+    )
+    release_held_report(db, msg, msg.device.port)
+
+
+def send_claimed(db: Session, messages: list[Message]) -> None:
+    """Submit claimed messages to their modems and record the outcomes.
+
+    Messages for devices behind the same modem agent go out in one request.
+    Retried campaign messages keep their campaign's lane. Failed messages,
+    including every message of a group whose send raised, are queued again or
+    marked failed by :func:`backend.sms.retry.record_failure`.
+    """
+    groups: dict[int | None, list[Message]] = {}
+    for msg in messages:
+        groups.setdefault(msg.campaign_id, []).append(msg)
+    for campaign_id, group in groups.items():
+        lane = TRANSACTIONAL if campaign_id is None else CAMPAIGN
+        try:
+            with span("outbound_send", messages=len(group)):
+                results = send_many(
+                    [(m.contact.msisdn, m.text, m.device.port) for m in group],
+                    [m.trace_id for m in group],
+                    lane,
+                    campaign_id,
+                )
+        except Exception as exc:
+            # A malformed agent reply and the like; retry the whole group.
+            results = [exc] * len(group)
+        for msg, result in zip(group, results):
+            with trace(msg.trace_id):
+                _record(db, msg, result)
+
+
+def wake_outbound() -> None:
+    """Tell the worker that new messages were queued."""
+    _WAKE.set()
+
+
+def _worker(stop: threading.Event) -> None:
+    # The worker starts when this process becomes the owner, so the first
+    # pass picks up what a previous owner left behind.
+    next_requeue = 0.0
+    while not stop.is_set():
+        _WAKE.clear()
+        claimed: list[Message] = []
+        db = SessionLocal()
+        try:
+            if time.monotonic() >= next_requeue:
+                requeue_stale(db)
+                next_requeue = time.monotonic() + SENDING_TIMEOUT / 2
+            claimed = claim_queued(db, OUTBOUND_BATCH_SIZE)
+            if claimed:
+                send_claimed(db, claimed)
+        except Exception as exc:  # pragma: no cover - best effort
+            logging.error("outbound worker error: %s", exc)
+        finally:
+            db.close()
+        if not claimed:
+            _WAKE.wait(OUTBOUND_POLL_INTERVAL)
+
+
+def start_outbound_worker(stop: threading.Event | None = None) -> threading.Thread:
+    """Drain the queue in a background thread until ``stop`` is set."""
+    thread = threading.Thread(
+        target=_worker, args=(stop or threading.Event(),), daemon=True
+    )
+    thread.start()
+    return thread
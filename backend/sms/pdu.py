@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import random
+from functools import lru_cache
 from typing import List, Tuple
 
 GSM_7BIT_BASIC = {chr(i) for i in range(32, 127)} | {"\n", "\r", "\f", "\b", "\t"}
@@ -22,32 +23,17 @@ def _encode_number(number: str) -> Tuple[str, str, int]:
 
 
 def _encode_gsm7(text: str, udh: bytes | None = None) -> Tuple[str, int]:
-    data = bytearray()
-    carry = 0
-    carry_bits = 0
-
-    def push(byte: int) -> None:
-        nonlocal carry, carry_bits
-        data.append(((byte << carry_bits) & 0xFF) | carry)
-        carry = byte >> (8 - carry_bits)
-        carry_bits += 1
-        if carry_bits == 8:
-            data.append(carry)
-            carry = 0
-            carry_bits = 0
-
-    if udh:
-        for b in udh:
-            push(b)
-    for ch in text:
-        push(ord(ch) & 0x7F)
-    if carry_bits:
-        data.append(carry)
+    # Septets are packed least significant bit first; with a header the text
+    # starts at the next septet boundary after it (fill bits).
+    offset = (len(udh) * 8 + 6) // 7 * 7 if udh else 0
+    value = 0
+    for index, ch in enumerate(text):
+        value |= (ord(ch) & 0x7F) << (offset + 7 * index)
+    bits = offset + 7 * len(text)
+    data = bytearray(value.to_bytes((bits + 7) // 8, "little"))
     if udh:
-        udl = len(data)
-    else:
-        udl = len(text)
-    return data.hex().upper(), udl
+        data[: len(udh)] = udh
+    return data.hex().upper(), offset // 7 + len(text)
 
 
 def _encode_ucs2(text: str, udh: bytes | None = None) -> Tuple[str, int]:
@@ -69,9 +55,20 @@ def _segment_text(text: str, encoding: str) -> List[str]:
     return [text[i : i + part] for i in range(0, len(text), part)]
 
 
+def _encoding(text: str) -> str:
+    return "gsm7" if all(ch in GSM_7BIT_BASIC for ch in text) else "ucs2"
+
+
+@lru_cache(maxsize=1024)
+def segment_info(text: str) -> tuple[str, int]:
+    """Return the encoding ``text`` is sent in and its number of segments."""
+    encoding = _encoding(text)
+    return encoding, len(_segment_text(text, encoding))
+
+
 def build_pdus(msisdn: str, text: str) -> list[dict[str, object]]:
     """Build PDUs for the given text, handling segmentation."""
-    encoding = "gsm7" if all(ch in GSM_7BIT_BASIC for ch in text) else "ucs2"
+    encoding = _encoding(text)
     segments = _segment_text(text, encoding)
     ref = random.randint(0, 255) if len(segments) > 1 else None
     toa, number, length = _encode_number(msisdn)
@@ -104,6 +101,26 @@ def build_pdus(msisdn: str, text: str) -> list[dict[str, object]]:
     return pdus
 
 
+def build_deliver_pdu(msisdn: str, text: str) -> str:
+    """Build an SMS-DELIVER PDU as a modem reports an inbound message."""
+    toa, number, length = _encode_number(msisdn)
+    if all(ch in GSM_7BIT_BASIC for ch in text):
+        dcs = "00"
+        ud, udl = _encode_gsm7(text)
+    else:
+        dcs = "08"
+        ud, udl = _encode_ucs2(text)
+    scts = "0" * 14
+    return f"0004{length:02X}{toa}{number}00{dcs}{scts}{udl:02X}{ud}"
+
+
+def build_status_report_pdu(ref: int, msisdn: str, status: int = 0) -> str:
+    """Build an SMS-STATUS-REPORT PDU for message reference ``ref``."""
+    toa, number, length = _encode_number(msisdn)
+    timestamps = "0" * 28
+    return f"0006{ref:02X}{length:02X}{toa}{number}{timestamps}{status:02X}"
+
+
 def _decode_gsm7(data: bytes, udhl: int = 0) -> str:
     bits = 0
     carry = 0
@@ -180,4 +197,5 @@ def parse_cds(pdu: str) -> Tuple[str, int]:
     i += 14  # SCTS
     i += 14  # discharge time
     status = int(pdu[i : i + 2], 16)
-    return ref.lstrip("0"), status
+    # Modems report the reference in decimal after +CMGS, so match that.
+    return str(int(ref, 16)), status
@@ -3,23 +3,42 @@
 from __future__ import annotations
 
 import logging
+import os
 import threading
 import time
+from typing import TYPE_CHECKING, Callable
 
-import serial
+from sqlalchemy.orm import Session
 
 from backend.db import SessionLocal
-from backend.models import Contact, Message
+from backend.devices.agents import AgentClient, send_message
+from backend.devices.lanes import device_turn
+from backend.devices.serial_port import open_port
+from backend.metrics import DLRS, INBOUND
+from backend.models import Contact, Device, Message
 from backend.sms.pdu import parse_cds, parse_pdu
 from backend.sms.sender import send_sms
 from backend.sms.store import INBOX
+from backend.tracing import span, trace
 from backend.utils import normalize_msisdn, notify_status
 
+if TYPE_CHECKING:
+    import serial
+
 INFO_TEMPLATE = "Thanks for your message."
+AGENT_RETRY = 5.0
+# How long a report that arrives before its message's ref is stored is kept.
+DLR_GRACE = float(os.getenv("DLR_GRACE", "30"))
+# A report may still follow a "temporary error" one.
+AWAITING_REPORT = ("sent", "unknown")
+
+# (device port, ref) -> (status, held until)
+_HELD: dict[tuple[str, str], tuple[int, float]] = {}
+_HELD_LOCK = threading.Lock()
 
 
 def _handle_inbound(
-    msisdn: str, text: str, device_id: str, port: serial.Serial
+    msisdn: str, text: str, device_id: str, port: serial.Serial | None = None
 ) -> None:
     db = SessionLocal()
     try:
@@ -35,66 +54,140 @@ def _handle_inbound(
             db.commit()
             db.refresh(contact)
         INBOX.append({"msisdn": norm, "text": text, "device_id": device_id})
+        INBOUND.inc(device_id)
         keyword = text.strip().upper()
         if keyword == "STOP":
             contact.opt_out = True
             db.commit()
         elif keyword == "INFO" and not contact.opt_out:
             try:
-                send_sms(msisdn, INFO_TEMPLATE, device_id, port=port)
+                if port is not None:
+                    with device_turn(device_id):
+                        send_sms(msisdn, INFO_TEMPLATE, device_id, port=port)
+                else:
+                    send_message(msisdn, INFO_TEMPLATE, device_id)
             except Exception as exc:  # pragma: no cover - hardware dependent
                 logging.warning("auto-reply failed: %s", exc)
     finally:
         db.close()
 
 
-def _handle_dlr(ref: str, status: int) -> None:
+def _find_reported(db: Session, ref: str, port: str) -> Message | None:
+    # Refs are only unique per modem and wrap after 255, so the newest
+    # message on the reporting device wins.
+    return (
+        db.query(Message)
+        .join(Device, Device.id == Message.device_id)
+        .filter(
+            Message.ref == ref,
+            Device.port == port,
+            Message.status.in_(AWAITING_REPORT),
+        )
+        .order_by(Message.id.desc())
+        .first()
+    )
+
+
+def _apply_dlr(db: Session, msg: Message, status: int) -> None:
+    with trace(msg.trace_id), span("dlr"):
+        if status < 0x20:
+            msg.status = "delivered"
+        elif status >= 0x40:
+            msg.status = "failed"
+            msg.error_code = f"{status:02X}"
+        else:
+            msg.status = "unknown"
+        DLRS.inc(msg.status)
+        db.commit()
+        notify_status(
+            {
+                "id": msg.id,
+                "msisdn": msg.contact.msisdn,
+                "status": msg.status,
+                "error_code": msg.error_code,
+                "campaign_id": msg.campaign_id,
+                "device_id": msg.device_id,
+            }
+        )
+
+
+def _hold(ref: str, status: int, port: str) -> None:
+    now = time.monotonic()
+    with _HELD_LOCK:
+        for key, (_, until) in list(_HELD.items()):
+            if until <= now:
+                del _HELD[key]
+                DLRS.inc("unmatched")
+        _HELD[(port, ref)] = (status, now + DLR_GRACE)
+
+
+def _unhold(ref: str, port: str) -> int | None:
+    with _HELD_LOCK:
+        held = _HELD.pop((port, ref), None)
+    return None if held is None else held[0]
+
+
+def release_held_report(db: Session, msg: Message, port: str) -> None:
+    """Apply a report for ``msg`` that arrived before its ref was stored.
+
+    Call after committing the ref; agents report deliveries as soon as each
+    message of a batch goes out, before the batch's refs are returned.
+    """
+    if msg.ref is None:
+        return
+    status = _unhold(msg.ref, port)
+    if status is not None:
+        _apply_dlr(db, msg, status)
+
+
+def _handle_dlr(ref: str, status: int, port: str) -> None:
     db = SessionLocal()
     try:
-        msg = db.query(Message).filter(Message.ref == ref).first()
-        if msg:
-            if status < 0x20:
-                msg.status = "delivered"
-            elif status >= 0x40:
-                msg.status = "failed"
-                msg.error_code = f"{status:02X}"
-            else:
-                msg.status = "unknown"
-            db.commit()
-            notify_status(
-                {
-                    "id": msg.id,
-                    "msisdn": msg.contact.msisdn,
-                    "status": msg.status,
-                    "error_code": msg.error_code,
-                }
-            )
+        msg = _find_reported(db, ref, port)
+        if msg is None and DLR_GRACE > 0:
+            _hold(ref, status, port)
+            # The ref may have been stored between the lookup and the hold;
+            # whoever takes the held report applies it.
+            msg = _find_reported(db, ref, port)
+            if msg is None or _unhold(ref, port) is None:
+                return
+        if msg is None:
+            DLRS.inc("unmatched")
+            return
+        _apply_dlr(db, msg, status)
     finally:
         db.close()
 
 
-def _reader(device_id: str, baud: int = 115200) -> None:
-    while True:
+def _reader(
+    device_id: str,
+    baud: int = 115200,
+    stop: threading.Event | None = None,
+    on_inbound: Callable[..., None] = _handle_inbound,
+    on_dlr: Callable[[str, int, str], None] = _handle_dlr,
+) -> None:
+    stop = stop or threading.Event()
+    while not stop.is_set():
         try:
-            with serial.Serial(device_id, baudrate=baud, timeout=5) as port:
+            with open_port(device_id, baud) as port:
                 port.write(b"AT+CMGF=0\r")
                 port.readline()
                 port.write(b"AT+CNMI=2,2,0,0,0\r")
                 port.readline()
-                while True:
+                while not stop.is_set():
                     line = port.readline().decode(errors="ignore").strip()
                     if line.startswith("+CMT:"):
                         pdu_line = port.readline().decode(errors="ignore").strip()
                         try:
                             msisdn, text = parse_pdu(pdu_line)
-                            _handle_inbound(msisdn, text, device_id, port)
+                            on_inbound(msisdn, text, device_id, port)
                         except Exception as exc:  # pragma: no cover - best effort
                             logging.warning("parse error: %s", exc)
                     elif line.startswith("+CDS:"):
                         pdu_line = port.readline().decode(errors="ignore").strip()
                         try:
                             ref, status = parse_cds(pdu_line)
-                            _handle_dlr(ref, status)
+                            on_dlr(ref, status, device_id)
                         except Exception as exc:  # pragma: no cover - best effort
                             logging.warning("dlr parse error: %s", exc)
                     elif not line:
@@ -104,10 +197,65 @@ def _reader(device_id: str, baud: int = 115200) -> None:
                         break
         except Exception as exc:  # pragma: no cover - hardware dependent
             logging.warning("receiver error on %s: %s", device_id, exc)
-            time.sleep(2)
+            stop.wait(2)
+
+
+def start_receiver(
+    device_id: str,
+    baud: int = 115200,
+    stop: threading.Event | None = None,
+    on_inbound: Callable[..., None] = _handle_inbound,
+    on_dlr: Callable[[str, int, str], None] = _handle_dlr,
+) -> threading.Thread:
+    """Read inbound messages and reports from ``device_id`` until ``stop``.
+
+    The handlers default to storing them; the modem agent forwards them.
+    """
+    thread = threading.Thread(
+        target=_reader,
+        args=(device_id, baud, stop, on_inbound, on_dlr),
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _listen(agent: AgentClient, stop: threading.Event) -> None:
+    import requests
+
+    after: int | None = None
+    while not stop.is_set():
+        try:
+            for event in agent.events(after):
+                if stop.is_set():
+                    break
+                after = event.get("seq", after)
+                kind = event.get("type")
+                if kind == "inbound":
+                    _handle_inbound(
+                        event["msisdn"], event["text"], f"{agent.name}:{event['port']}"
+                    )
+                elif kind == "dlr":
+                    _handle_dlr(
+                        event["ref"], event["status"], f"{agent.name}:{event['port']}"
+                    )
+                elif kind == "lagged":
+                    logging.warning(
+                        "agent %s dropped %s events", agent.name, event["dropped"]
+                    )
+        except requests.RequestException as exc:
+            logging.warning("agent %s stream error: %s", agent.name, exc)
+        except Exception as exc:  # pragma: no cover - best effort
+            logging.warning("agent %s event error: %s", agent.name, exc)
+        stop.wait(AGENT_RETRY)
 
 
-def start_receiver(device_id: str, baud: int = 115200) -> threading.Thread:
-    thread = threading.Thread(target=_reader, args=(device_id, baud), daemon=True)
+def start_agent_listener(
+    agent: AgentClient, stop: threading.Event | None = None
+) -> threading.Thread:
+    """Handle inbound messages and reports streamed by a modem agent."""
+    thread = threading.Thread(
+        target=_listen, args=(agent, stop or threading.Event()), daemon=True
+    )
     thread.start()
     return thread
@@ -0,0 +1,132 @@
+"""Retrying failed submissions and steering them away from failing modems.
+
+A failed submission is classified from its error: ``+CMS ERROR`` codes that
+describe the recipient or the message itself are permanent, everything else
+(network and SIM trouble, bare ``ERROR``, I/O and agent errors) is
+transient. Transient failures put the message back in the outbound queue
+with an exponential backoff, on another healthy device where there is one.
+A device that fails ``DEVICE_FAILURE_THRESHOLD`` times in a row is skipped
+for ``DEVICE_COOLDOWN`` seconds, after which it is tried again.
+
+A retry resubmits the whole message. When a multipart message failed after
+some of its segments went out, the recipient gets those segments again.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from backend.metrics import SEND_RETRIES
+from backend.models import Device, Message
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "300"))
+DEVICE_FAILURE_THRESHOLD = int(os.getenv("DEVICE_FAILURE_THRESHOLD", "3"))
+DEVICE_COOLDOWN = float(os.getenv("DEVICE_COOLDOWN", "60"))
+
+# 3GPP TS 24.011 RP causes and TS 27.005 codes that no retry can fix.
+PERMANENT_CMS_ERRORS = frozenset(
+    {1, 8, 10, 21, 28, 29, 30, 50, 69, 81, 95, 96, 97, 98, 99, 111}
+    | set(range(128, 256))  # TP-FCS errors in the submitted TPDU
+    # 302 (operation not allowed) is left out: it is usually modem state,
+    # such as a SIM still registering, and clears on its own.
+    | {301, 303, 304, 305, 321, 340}
+)
+
+_CMS_RE = re.compile(r"\+CMS ERROR:\s*(\d+)")
+
+# port -> (consecutive failures, unhealthy until)
+_HEALTH: dict[str, tuple[int, float]] = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+def cms_code(error: Exception | str) -> int | None:
+    """The ``+CMS ERROR`` code in ``error``, if it carries one."""
+    match = _CMS_RE.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def classify(error: Exception | str) -> tuple[str, bool]:
+    """Return ``(error code, transient)`` for a failed submission."""
+    code = cms_code(error)
+    if code is not None:
+        return f"CMS {code}", code not in PERMANENT_CMS_ERRORS
+    return str(error)[:200] or type(error).__name__, True
+
+
+def backoff(attempts: int) -> float:
+    """Seconds to wait before attempt ``attempts + 1``, with jitter."""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def record_result(port: str, error: Exception | None = None) -> None:
+    """Track consecutive transient failures of ``port`` for :func:`healthy`."""
+    with _HEALTH_LOCK:
+        if error is None:
+            _HEALTH.pop(port, None)
+            return
+        if not classify(error)[1]:
+            return  # the message was at fault, not the device
+        failures = _HEALTH.get(port, (0, 0.0))[0] + 1
+        until = 0.0
+        if failures >= DEVICE_FAILURE_THRESHOLD:
+            until = time.monotonic() + DEVICE_COOLDOWN
+            logging.warning("device %s failing, skipping it for a while", port)
+        _HEALTH[port] = (failures, until)
+
+
+def healthy(port: str) -> bool:
+    with _HEALTH_LOCK:
+        return _HEALTH.get(port, (0, 0.0))[1] <= time.monotonic()
+
+
+def cooldown_left(ports) -> float:
+    """Seconds until the first of ``ports`` may be tried again."""
+    now = time.monotonic()
+    with _HEALTH_LOCK:
+        waits = [max(0.0, _HEALTH.get(p, (0, 0.0))[1] - now) for p in ports]
+    return min(waits, default=0.0)
+
+
+def _reroute(db: Session, msg: Message) -> None:
+    devices = (
+        db.query(Device)
+        .filter(Device.active.is_(True), Device.id != msg.device_id)
+        .order_by(Device.id)
+        .all()
+    )
+    candidates = [d for d in devices if healthy(d.port)]
+    if candidates:
+        msg.device_id = candidates[msg.id % len(candidates)].id
+
+
+def record_failure(db: Session, msg: Message, error: Exception | str) -> bool:
+    """Count a failed attempt at ``msg`` and queue a retry if it is worth one.
+
+    Updates but does not commit ``msg``. Returns whether a retry was queued.
+    """
+    code, transient = classify(error)
+    msg.attempts = (msg.attempts or 0) + 1
+    msg.error_code = code
+    if not transient or msg.attempts >= RETRY_MAX_ATTEMPTS:
+        msg.status = "failed"
+        msg.next_attempt_at = None
+        SEND_RETRIES.inc("failed")
+        return False
+    if msg.id is None:
+        db.flush()
+    _reroute(db, msg)
+    msg.status = "queued"
+    msg.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff(msg.attempts))
+    SEND_RETRIES.inc("retry")
+    return True
@@ -3,12 +3,48 @@
 from __future__ import annotations
 
 import logging
-from typing import List
-
-import serial
+import os
+import time
+from typing import TYPE_CHECKING, List
 
+from backend.devices.ratecontrol import pace, record
+from backend.devices.serial_port import open_port
+from backend.metrics import AT_LATENCY, CMS_ERRORS, SEGMENTS
 from backend.sms.pdu import build_pdus
 from backend.sms.store import OUTBOX
+from backend.tracing import span
+
+if TYPE_CHECKING:
+    import serial
+
+# Longest wait for the network to accept a submission.
+SUBMIT_TIMEOUT = float(os.getenv("SUBMIT_TIMEOUT", "60"))
+
+
+def _submit(
+    port: serial.Serial, device_id: str, tpdu_length: int, pdu: str, started: float
+) -> str:
+    """Submit one PDU with ``AT+CMGS`` and return its message reference."""
+    port.write(f"AT+CMGS={tpdu_length}\r".encode())
+    port.readline()
+    port.write(bytes.fromhex(pdu) + b"\x1a")
+    ref = ""
+    while True:
+        line = port.readline().decode(errors="ignore").strip()
+        if not line:
+            if time.perf_counter() - started > SUBMIT_TIMEOUT:
+                raise TimeoutError(f"no answer to AT+CMGS from {device_id}")
+            continue
+        if line.startswith("+CMGS:"):
+            ref = line.split(":")[1].strip()
+        if line in {"OK", "ERROR"} or line.startswith("+CMS ERROR"):
+            AT_LATENCY.observe(time.perf_counter() - started, device_id, "CMGS")
+            if line.startswith("+CMS ERROR"):
+                code = line.partition(":")[2].strip()
+                CMS_ERRORS.inc(device_id, code)
+            if line != "OK":
+                raise RuntimeError(line)
+            return ref
 
 
 def send_sms(
@@ -25,31 +61,29 @@ def send_sms(
 
     close_port = False
     if port is None:
-        port = serial.Serial(device_id, baudrate=baud, timeout=5)
+        port = open_port(device_id, baud)
         close_port = True
     try:
-        pdus = build_pdus(msisdn, text)
+        with span("build_pdus"):
+            pdus = build_pdus(msisdn, text)
+        SEGMENTS.observe(len(pdus))
         refs: list[str] = []
-        port.write(b"AT+CMGF=0\r")
-        port.readline()
+        with AT_LATENCY.time(device_id, "CMGF"):
+            port.write(b"AT+CMGF=0\r")
+            port.readline()
         for seg in pdus:
             pdu = seg["pdu"]
             tpdu_length = (len(pdu) // 2) - 1
             logging.info("sending PDU %s", pdu)
-            port.write(f"AT+CMGS={tpdu_length}\r".encode())
-            port.readline()
-            port.write(bytes.fromhex(pdu) + b"\x1a")
-            ref = ""
-            while True:
-                line = port.readline().decode(errors="ignore").strip()
-                if not line:
-                    continue
-                if line.startswith("+CMGS:"):
-                    ref = line.split(":")[1].strip()
-                if line in {"OK", "ERROR"} or line.startswith("+CMS ERROR"):
-                    if line != "OK":
-                        raise RuntimeError(line)
-                    break
+            pace(device_id)
+            with span("modem_submit", device=device_id):
+                started = time.perf_counter()
+                try:
+                    ref = _submit(port, device_id, tpdu_length, pdu, started)
+                except Exception as exc:
+                    record(device_id, time.perf_counter() - started, exc)
+                    raise
+                record(device_id, time.perf_counter() - started)
             refs.append(ref)
             OUTBOX.append(
                 {
@@ -0,0 +1,150 @@
+"""Timing spans and per-message trace ids.
+
+A trace id follows a message from the API request or campaign that created
+it through sending and its delivery report; it is stored on the message and
+included in status events. Spans time the stages in between and are handed
+to pluggable sinks. With no sink registered ``span()`` returns a shared
+no-op context manager, so instrumented code costs next to nothing.
+
+``TRACE_SINKS`` enables the built-in sinks: ``metrics`` feeds the
+``muxo_span_seconds`` histogram and ``log`` logs every span. Others can be
+added with :func:`add_sink`.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator, Self
+
+from backend.metrics import Histogram
+
+SpanSink = Callable[[str, "str | None", float, dict], None]
+
+_SINKS: list[SpanSink] = []
+_NULL_SPAN = nullcontext()
+_TRACE_ID: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "trace_id", default=None
+)
+
+SPAN_SECONDS = Histogram("muxo_span_seconds", "Duration of traced stages.", ("span",))
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_trace_id() -> str | None:
+    return _TRACE_ID.get()
+
+
+@contextmanager
+def trace(trace_id: str | None) -> Iterator[str | None]:
+    """Make ``trace_id`` the current trace for the enclosed code."""
+    token = _TRACE_ID.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _TRACE_ID.reset(token)
+
+
+class TraceMiddleware:
+    """ASGI middleware running each request under its ``X-Trace-Id``.
+
+    The caller's id is used when it sends one, otherwise a new one is made
+    while spans are enabled; either way it is echoed in the response. With
+    no id and no sinks the request passes straight through.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-trace-id":
+                trace_id = value.decode("latin-1")
+                break
+        if not trace_id:
+            if not _SINKS:
+                await self.app(scope, receive, send)
+                return
+            trace_id = new_trace_id()
+        header = (b"x-trace-id", trace_id.encode("latin-1"))
+
+        async def send_with_trace_id(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        with trace(trace_id):
+            await self.app(scope, receive, send_with_trace_id)
+
+
+def _emit(name: str, duration: float, attrs: dict) -> None:
+    trace_id = _TRACE_ID.get()
+    for sink in _SINKS:
+        try:
+            sink(name, trace_id, duration, attrs)
+        except Exception as exc:  # pragma: no cover - misbehaving sink
+            logging.warning("span sink failed: %s", exc)
+
+
+class _Span:
+    __slots__ = ("attrs", "name", "started")
+
+    def __init__(self, name: str, attrs: dict) -> None:
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> Self:
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _emit(self.name, duration, self.attrs)
+
+
+def span(name: str, **attrs):
+    """Time the enclosed block as stage ``name`` of the current trace."""
+    if not _SINKS:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+
+def record_span(name: str, duration: float, **attrs) -> None:
+    """Report a stage that was timed elsewhere, e.g. across two hooks."""
+    if _SINKS:
+        _emit(name, duration, attrs)
+
+
+def add_sink(sink: SpanSink) -> None:
+    _SINKS.append(sink)
+
+
+def remove_sink(sink: SpanSink) -> None:
+    _SINKS.remove(sink)
+
+
+def metrics_sink(name: str, trace_id: str | None, duration: float, attrs: dict):
+    SPAN_SECONDS.observe(duration, name)
+
+
+def log_sink(name: str, trace_id: str | None, duration: float, attrs: dict):
+    logging.info("span %s trace=%s %.3fms %s", name, trace_id, duration * 1e3, attrs)
+
+
+_BUILTIN_SINKS = {"metrics": metrics_sink, "log": log_sink}
+
+for _name in filter(None, os.getenv("TRACE_SINKS", "").split(",")):
+    add_sink(_BUILTIN_SINKS[_name.strip()])
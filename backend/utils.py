@@ -1,39 +1,115 @@
-"""Utility helpers for MSISDN normalization and webhooks."""
+"""Utility helpers for MSISDN normalization, JSON encoding and webhooks."""
 
 from __future__ import annotations
 
-import logging
+import multiprocessing
 import os
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable
 
-import phonenumbers
-import requests
-from phonenumbers import NumberParseException, PhoneNumberFormat
+from backend.events import BUS
+from backend.tracing import current_trace_id, span
+from backend.webhooks import DISPATCHER
 
 DEFAULT_COUNTRY = os.getenv("DEFAULT_COUNTRY", "US")
-STATUS_WEBHOOK_URL = os.getenv("STATUS_WEBHOOK_URL")
+MSISDN_CACHE_SIZE = int(os.getenv("MSISDN_CACHE_SIZE", "100000"))
+# Kept below BULK_CHUNK_SIZE so a chunk of mostly new numbers goes parallel.
+MSISDN_PARALLEL_THRESHOLD = int(os.getenv("MSISDN_PARALLEL_THRESHOLD", "2000"))
+MSISDN_PARALLEL_CHUNK = 5000
 
 
-def normalize_msisdn(msisdn: str) -> str:
-    """Normalize a phone number to E.164 format using default country.
+def _normalize_uncached(msisdn: str) -> tuple[str | None, str | None]:
+    """Return ``(e164, None)`` for a valid number or ``(None, error)``."""
+    # Only cache misses get here, so the deferred import costs nothing later.
+    import phonenumbers
+    from phonenumbers import NumberParseException, PhoneNumberFormat
 
-    Raises ValueError if the number is invalid.
-    """
     try:
         num = phonenumbers.parse(msisdn, DEFAULT_COUNTRY)
     except NumberParseException as exc:  # pragma: no cover - library errors
-        raise ValueError(str(exc)) from exc
+        return None, str(exc)
     if not phonenumbers.is_valid_number(num):
-        raise ValueError("invalid msisdn")
-    return phonenumbers.format_number(num, PhoneNumberFormat.E164)
+        return None, "invalid msisdn"
+    return phonenumbers.format_number(num, PhoneNumberFormat.E164), None
+
+
+# Invalid numbers are cached as well, so junk rows repeated across imports
+# do not pay for a second parse either.
+_normalize_cached = lru_cache(maxsize=MSISDN_CACHE_SIZE)(_normalize_uncached)
+
+
+def normalize_msisdn(msisdn: str) -> str:
+    """Normalize a phone number to E.164 format using default country.
+
+    Results, including failures, are memoized in a bounded LRU cache.
+    Raises ValueError if the number is invalid.
+    """
+    with span("normalize_msisdn"):
+        normalized, error = _normalize_cached(msisdn)
+    if normalized is None:
+        raise ValueError(error)
+    return normalized
+
+
+def _normalize_chunk(values: list[str]) -> list[str | None]:
+    return [_normalize_uncached(v)[0] for v in values]
+
+
+def normalize_pool(processes: int) -> ProcessPoolExecutor:
+    """Return a process pool for ``normalize_many`` that callers can reuse.
+
+    Workers are spawned rather than forked, since the server process runs
+    other threads, and only start on the first parallel batch.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def normalize_many(
+    values: Iterable[str],
+    processes: int | None = None,
+    pool: ProcessPoolExecutor | None = None,
+) -> list[str | None]:
+    """Normalize a column of numbers, returning ``None`` for invalid ones.
+
+    Each distinct value is parsed once. With ``processes`` greater than one
+    and at least ``MSISDN_PARALLEL_THRESHOLD`` distinct values, parsing is
+    spread over ``pool`` (or a pool created for this call) and bypasses the
+    in-process cache.
+    """
+    values = list(values)
+    distinct = list(dict.fromkeys(values))
+    if processes and processes > 1 and len(distinct) >= MSISDN_PARALLEL_THRESHOLD:
+        size = min(MSISDN_PARALLEL_CHUNK, -(-len(distinct) // processes))
+        chunks = [distinct[i : i + size] for i in range(0, len(distinct), size)]
+        results: dict[str, str | None] = {}
+        with nullcontext(pool) if pool else normalize_pool(processes) as executor:
+            for chunk, normalized in zip(
+                chunks, executor.map(_normalize_chunk, chunks)
+            ):
+                results.update(zip(chunk, normalized))
+    else:
+        results = {v: _normalize_cached(v)[0] for v in distinct}
+    return [results[v] for v in values]
+
+
+def json_default(value):
+    """``json.dumps`` fallback for values read straight from the database."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
 
 
 def notify_status(payload: dict) -> None:
-    """POST a status update to the configured webhook if set."""
-    url: Optional[str] = STATUS_WEBHOOK_URL
-    if not url:
-        return
-    try:
-        requests.post(url, json=payload, timeout=5)
-    except Exception as exc:  # pragma: no cover - network errors
-        logging.warning("webhook post failed: %s", exc)
+    """Publish a status update to live streams and the webhook if set.
+
+    Webhook delivery happens on background threads; see ``backend.webhooks``.
+    """
+    payload.setdefault("trace_id", current_trace_id())
+    with span("notify_status"):
+        BUS.publish(payload)
+        DISPATCHER.submit(payload)
@@ -0,0 +1,189 @@
+"""Background delivery of status webhooks.
+
+Events are queued without blocking the caller and posted by worker threads
+that reuse keep-alive connections. Failed posts are retried with exponential
+backoff; events that still fail, or that do not fit in the queue, are
+appended to a dead-letter file and can be replayed later.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from backend.metrics import WEBHOOK_LATENCY
+
+if TYPE_CHECKING:  # requests is imported by the workers when first needed
+    import requests
+
+STATUS_WEBHOOK_URL = os.getenv("STATUS_WEBHOOK_URL")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "1"))
+WEBHOOK_BATCH_WAIT = float(os.getenv("WEBHOOK_BATCH_WAIT", "0.2"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "5"))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "5"))
+WEBHOOK_BACKOFF = float(os.getenv("WEBHOOK_BACKOFF", "0.5"))
+WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "30"))
+DEAD_LETTER_PATH = Path(
+    os.getenv(
+        "WEBHOOK_DEAD_LETTER_PATH",
+        Path(__file__).resolve().parent.parent / "deadletter" / "webhooks.ndjson",
+    )
+)
+
+_RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class WebhookDispatcher:
+    """Bounded queue of events drained by a small pool of sender threads.
+
+    With ``batch_size`` above one, up to that many events are posted
+    together as a JSON array; otherwise each event is posted on its own.
+    """
+
+    def __init__(
+        self,
+        url: str | None = STATUS_WEBHOOK_URL,
+        workers: int = WEBHOOK_WORKERS,
+        maxsize: int = WEBHOOK_QUEUE_SIZE,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+    ) -> None:
+        self.url = url
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue: queue.Queue[dict] = queue.Queue(maxsize=maxsize)
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._dead_letter_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._run, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload: dict) -> None:
+        """Queue an event; never blocks."""
+        if not self.url:
+            return
+        self.start()
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            logging.warning("webhook queue full, dead-lettering event")
+            self.dead_letter([payload], "queue full")
+
+    def _session(self) -> requests.Session:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _next_batch(self) -> list[dict]:
+        batch = [self.queue.get(timeout=1)]
+        deadline = time.monotonic() + WEBHOOK_BATCH_WAIT
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _post(self, session: requests.Session, batch: list[dict]) -> None:
+        import requests
+
+        body = batch if self.batch_size > 1 else batch[0]
+        error = ""
+        for attempt in range(WEBHOOK_MAX_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                response = session.post(self.url, json=body, timeout=WEBHOOK_TIMEOUT)
+            except requests.RequestException as exc:
+                WEBHOOK_LATENCY.observe(time.perf_counter() - started, "error")
+                error = str(exc)
+            else:
+                outcome = "ok" if response.ok else "error"
+                WEBHOOK_LATENCY.observe(time.perf_counter() - started, outcome)
+                if response.ok:
+                    return
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in _RETRY_STATUSES:
+                    break
+            if self._stop.is_set():
+                break
+            if attempt < WEBHOOK_MAX_RETRIES:
+                delay = min(WEBHOOK_BACKOFF * 2**attempt, WEBHOOK_BACKOFF_MAX)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        logging.warning("webhook post failed: %s", error)
+        self.dead_letter(batch, error)
+
+    def _run(self) -> None:
+        session = self._session()
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                continue
+            self._post(session, batch)
+
+    def dead_letter(self, events: list[dict], error: str) -> None:
+        with self._dead_letter_lock:
+            DEAD_LETTER_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with DEAD_LETTER_PATH.open("a") as f:
+                for event in events:
+                    f.write(json.dumps({"error": error, "event": event}) + "\n")
+
+    def replay_dead_letters(self) -> int:
+        """Queue all dead-lettered events again and return how many."""
+        with self._dead_letter_lock:
+            if not DEAD_LETTER_PATH.exists():
+                return 0
+            pending = DEAD_LETTER_PATH.with_suffix(".replaying")
+            DEAD_LETTER_PATH.replace(pending)
+        count = 0
+        with pending.open() as f:
+            for line in f:
+                self.submit(json.loads(line)["event"])
+                count += 1
+        pending.unlink()
+        return count
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Deliver what is queued, waiting up to ``timeout`` seconds."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            for thread in self._threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+            self._threads = []
+        leftover: list[dict] = []
+        while True:
+            try:
+                leftover.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self.dead_letter(leftover, "shutdown")
+
+
+DISPATCHER = WebhookDispatcher()
@@ -0,0 +1,341 @@
+"""Load-test the HTTP API at several database sizes.
+
+For every size a scratch SQLite database is seeded with contacts, one
+campaign and its messages, and the API is started with a simulated modem in
+place of hardware. Each endpoint is then driven by a fixed number of
+keep-alive clients for a fixed time; p50/p95/p99 latency and requests per
+second are reported per endpoint. Usage::
+
+    python benchmarks/api_load.py [--sizes small,medium] [--concurrency 16]
+        [--duration 10] [--baseline FILE] [--save-baseline]
+
+Sizes are ``small`` (10k contacts, 100k messages), ``medium`` (1M contacts,
+1M messages) and ``large`` (1M contacts, 10M messages). With a baseline
+file the results are compared against it and the run exits non-zero when an
+endpoint's p99 or throughput is worse than ``--tolerance`` allows;
+``--save-baseline`` overwrites the file with this run. The committed
+baseline comes from one development machine: regenerate it with
+``--save-baseline`` on the host you compare on before relying on the check.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = {
+    "small": {"contacts": 10_000, "messages": 100_000, "inbox": 10_000},
+    "medium": {"contacts": 1_000_000, "messages": 1_000_000, "inbox": 100_000},
+    "large": {"contacts": 1_000_000, "messages": 10_000_000, "inbox": 100_000},
+}
+CHUNK = 50_000
+DEVICE_PORT = "sim:0"
+DEFAULT_BASELINE = Path(__file__).with_name("api_load_baseline.json")
+
+# Seeds the in-memory inbox, then serves the app like ``uvicorn`` would.
+SERVER = """
+import sys, uvicorn
+from backend.sms.store import INBOX
+INBOX.extend(
+    {"msisdn": "+14152%06d" % i, "text": "inbound %d" % i, "device_id": "sim:0"}
+    for i in range(int(sys.argv[2]))
+)
+uvicorn.run("backend.main:app", port=int(sys.argv[1]), log_level="warning",
+            access_log=False)
+"""
+
+
+def msisdn(i: int) -> str:
+    return f"+1415{2_000_000 + i:07d}"
+
+
+def seed(url: str, contacts: int, messages: int, inbox: int) -> dict:
+    """Create the schema and rows; return what the endpoints will ask for."""
+    from sqlalchemy import create_engine, insert
+
+    from backend.auth import get_password_hash
+    from backend.db import Base
+    from backend.models import (
+        Campaign,
+        Contact,
+        Device,
+        List,
+        ListMember,
+        Message,
+        User,
+    )
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    members = min(contacts, 100_000)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "username": "bench",
+                    "password_hash": get_password_hash("bench"),
+                    "role": "admin",
+                }
+            ],
+        )
+        conn.execute(insert(Device), [{"name": "bench", "port": DEVICE_PORT}])
+        for start in range(0, contacts, CHUNK):
+            conn.execute(
+                insert(Contact),
+                [
+                    {"msisdn": msisdn(i), "opt_out": False, "created_at": now}
+                    for i in range(start, min(start + CHUNK, contacts))
+                ],
+            )
+        conn.execute(insert(List), [{"name": "bench"}])
+        for start in range(0, members, CHUNK):
+            conn.execute(
+                insert(ListMember),
+                [
+                    {"list_id": 1, "contact_id": i + 1, "added_at": now}
+                    for i in range(start, min(start + CHUNK, members))
+                ],
+            )
+        conn.execute(
+            insert(Campaign),
+            [
+                {
+                    "name": "bench",
+                    "template": "benchmark",
+                    "list_id": 1,
+                    "start_time": now - timedelta(days=1),
+                    "rate_limit": 1,
+                    "status": "done",
+                }
+            ],
+        )
+        statuses = ("sent", "delivered", "delivered", "failed")
+        for start in range(0, messages, CHUNK):
+            conn.execute(
+                insert(Message),
+                [
+                    {
+                        # Half of the history belongs to the campaign.
+                        "campaign_id": 1 if i % 2 else None,
+                        "contact_id": i % contacts + 1,
+                        "device_id": 1,
+                        "text": f"benchmark message {i}",
+                        "ref": str(i % 255 + 1),
+                        "status": statuses[i % len(statuses)],
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for i in range(start, min(start + CHUNK, messages))
+                ],
+            )
+    engine.dispose()
+    return {"contacts": contacts, "messages": messages, "inbox": inbox}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            url = f"http://127.0.0.1:{port}/healthz"
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if json.load(r)["status"] != "starting":
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+def login(port: int) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    body = json.dumps({"username": "bench", "password": "bench"})
+    conn.request("POST", "/api/login", body, {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    token = json.loads(response.read())["access_token"]
+    conn.close()
+    return token
+
+
+def scenarios(data: dict) -> dict:
+    """Endpoint name -> callable returning ``(method, path, body)``."""
+    contacts, messages = data["contacts"], data["messages"]
+    return {
+        "POST /api/messages": lambda rng: (
+            "POST",
+            "/api/messages",
+            json.dumps(
+                {
+                    "msisdn": msisdn(rng.randrange(contacts)),
+                    "text": "load test",
+                    "device_id": DEVICE_PORT,
+                }
+            ),
+        ),
+        "GET /api/messages/{id}": lambda rng: (
+            "GET",
+            f"/api/messages/{rng.randint(1, messages)}",
+            None,
+        ),
+        "GET /api/contacts": lambda rng: (
+            "GET",
+            f"/api/contacts?after_id={rng.randrange(contacts)}",
+            None,
+        ),
+        "GET /api/campaigns/{id}": lambda rng: ("GET", "/api/campaigns/1", None),
+        "GET /api/inbox": lambda rng: ("GET", "/api/inbox", None),
+    }
+
+
+def drive(port: int, token: str, request, concurrency: int, duration: float):
+    latencies: list[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    deadline = time.perf_counter() + duration
+
+    def client(seed: int) -> None:
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        own: list[float] = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            method, path, body = request(rng)
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                ok = False
+            own.append(time.perf_counter() - start)
+            failed += not ok
+        conn.close()
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1e3,
+        "p95_ms": cuts[94] * 1e3,
+        "p99_ms": cuts[98] * 1e3,
+    }
+
+
+def run_size(name: str, concurrency: int, duration: float) -> dict:
+    tmp = tempfile.mkdtemp(prefix="muxo-bench-")
+    url = f"sqlite:///{tmp}/bench.db"
+    started = time.perf_counter()
+    data = seed(url, **SIZES[name])
+    print(f"{name}: seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=url,
+        SIMULATED_MODEMS="1",
+        # Measure the API, not the modem pacing.
+        ADAPTIVE_RATE="0",
+        PYTHONWARNINGS="ignore",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER, str(port), str(data["inbox"])],
+        cwd=ROOT,
+        env=env,
+    )
+    results = {}
+    try:
+        wait_ready(port)
+        token = login(port)
+        for endpoint, request in scenarios(data).items():
+            results[endpoint] = drive(port, token, request, concurrency, duration)
+            print(f"{name}: {endpoint} done", file=sys.stderr)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Annotate ``results`` with ratios to the baseline; return regressions."""
+    regressions = []
+    for size, endpoints in results.items():
+        for endpoint, current in endpoints.items():
+            before = baseline.get(size, {}).get(endpoint)
+            if not before:
+                continue
+            p99 = current["p99_ms"] / before["p99_ms"] if before["p99_ms"] else 1.0
+            rps = current["rps"] / before["rps"] if before["rps"] else 1.0
+            current["vs_baseline"] = {"p99": round(p99, 3), "rps": round(rps, 3)}
+            if p99 > 1 + tolerance or rps < 1 - tolerance:
+                regressions.append(f"{size} {endpoint}: p99 x{p99:.2f}, rps x{rps:.2f}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="small")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    # Loose by default; tighten it against a baseline taken on this host.
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    results = {
+        size: run_size(size, args.concurrency, args.duration)
+        for size in args.sizes.split(",")
+    }
+    regressions: list[str] = []
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+    print(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+    for line in regressions:
+        print(f"regression: {line}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark online backups and timed restore verification.
+
+Seeds a scratch SQLite database, takes a full and an incremental backup and
+verifies both by restoring them. Usage::
+
+    python benchmarks/backup_restore.py [messages]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+TMP = tempfile.mkdtemp(prefix="muxo-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP}/bench.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, update
+
+from backend import maintenance
+from backend.db import Base, engine
+from backend.models import Contact, Device, Message
+
+
+def seed(messages: int) -> None:
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Device), [{"name": "bench", "port": "/dev/null"}])
+        conn.execute(
+            insert(Contact),
+            [{"msisdn": f"+1555{i:07d}", "created_at": now} for i in range(1000)],
+        )
+        for start in range(0, messages, 10000):
+            conn.execute(
+                insert(Message),
+                [
+                    {
+                        "contact_id": i % 1000 + 1,
+                        "device_id": 1,
+                        "text": f"benchmark message {i}",
+                        "status": "sent",
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for i in range(start, min(start + 10000, messages))
+                ],
+            )
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    maintenance.BACKUP_DIR = os.path.join(TMP, "backups")
+    seed(messages)
+    full, full_time = timed(maintenance.backup_db, incremental=False)
+    with engine.begin() as conn:
+        conn.execute(
+            update(Message)
+            .where(Message.id <= messages // 100)
+            .values(status="delivered")
+        )
+    time.sleep(1)  # backups are named by second
+    delta, delta_time = timed(maintenance.backup_db, incremental=True)
+    report = {
+        "messages": messages,
+        "db_bytes": os.path.getsize(f"{TMP}/bench.db"),
+        "full": {
+            "bytes": os.path.getsize(full),
+            "backup_seconds": full_time,
+            **maintenance.verify_backup(full),
+        },
+        "incremental": {
+            "bytes": os.path.getsize(delta),
+            "backup_seconds": delta_time,
+            **maintenance.verify_backup(delta),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
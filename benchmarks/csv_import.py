@@ -0,0 +1,56 @@
+"""Benchmark the streaming CSV campaign import.
+
+Writes a CSV with mostly new and some repeated or invalid numbers into a
+scratch database and reports rows per second. Usage::
+
+    python benchmarks/csv_import.py [rows]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP = tempfile.mkdtemp(prefix="muxo-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP}/bench.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import campaign_watcher
+from backend.db import Base, engine
+
+
+def write_csv(path: Path, rows: int) -> None:
+    with path.open("w") as f:
+        f.write("msisdn,text\n")
+        for i in range(rows):
+            if i % 50 == 0:
+                number = "not-a-number"
+            elif i % 10 == 0:
+                number = "(415) 200-0001"
+            else:
+                number = f"(415) {200 + i // 10000 % 800:03d}-{i % 10000:04d}"
+            f.write(f"{number},benchmark\n")
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    Base.metadata.create_all(engine)
+    path = Path(TMP) / "bench.csv"
+    write_csv(path, rows)
+    start = time.perf_counter()
+    campaign_watcher._process_csv(path)
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {"rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
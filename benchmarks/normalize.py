@@ -0,0 +1,58 @@
+"""Benchmark MSISDN normalization: per-call, cached and batch.
+
+Usage::
+
+    python benchmarks/normalize.py [rows] [distinct] [processes]
+
+The parallel figure is ``null`` when ``normalize_many`` would not use a
+process pool (one process, or fewer distinct values than
+``MSISDN_PARALLEL_THRESHOLD``).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import utils
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    pool = [f"(415) {200 + i // 10000:03d}-{i % 10000:04d}" for i in range(distinct)]
+    values = [random.choice(pool) for _ in range(rows)]
+
+    report: dict[str, float | int | None] = {"rows": rows, "distinct": distinct}
+    start = time.perf_counter()
+    for value in values:
+        utils._normalize_uncached(value)
+    report["uncached_rows_per_second"] = rows / (time.perf_counter() - start)
+
+    utils._normalize_cached.cache_clear()
+    start = time.perf_counter()
+    utils.normalize_many(values)
+    report["batch_rows_per_second"] = rows / (time.perf_counter() - start)
+
+    report["processes"] = processes
+    if processes > 1 and distinct >= utils.MSISDN_PARALLEL_THRESHOLD:
+        # Start cold, as the batch run did.
+        utils._normalize_cached.cache_clear()
+        start = time.perf_counter()
+        utils.normalize_many(values, processes=processes)
+        report["parallel_rows_per_second"] = rows / (time.perf_counter() - start)
+    else:
+        # normalize_many would take the cached path; timing it again would
+        # only measure warm cache hits.
+        report["parallel_rows_per_second"] = None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark how quickly a node starts.
+
+Times a cold import of ``backend.main``, then starts uvicorn against a
+scratch database with simulated modems and reports when ``/healthz`` first
+answers and when every subsystem is up. Usage::
+
+    python benchmarks/startup.py [modems]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp(prefix="muxo-bench-")
+TIMEOUT = 60
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", "import backend.main"],
+        cwd=ROOT,
+        env=env,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def healthz(port: int) -> dict | None:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as r:
+            return json.load(r)
+    except OSError:
+        return None
+
+
+def main() -> None:
+    modems = sys.argv[1] if len(sys.argv) > 1 else "4"
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{TMP}/bench.db",
+        SIMULATED_MODEMS=modems,
+    )
+    subprocess.run(
+        [
+            sys.executable,
+            "-W",
+            "ignore",
+            "-c",
+            (
+                "import backend.models; from backend.db import Base, engine; "
+                "Base.metadata.create_all(engine)"
+            ),
+        ],
+        cwd=ROOT,
+        env=env,
+        check=True,
+    )
+    result = {"modems": int(modems), "import_seconds": time_import(env)}
+
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < TIMEOUT:
+            health = healthz(port)
+            if health is not None:
+                result.setdefault("first_healthz_seconds", time.perf_counter() - start)
+                if health["status"] != "starting":
+                    result["ready_seconds"] = time.perf_counter() - start
+                    result["status"] = health["status"]
+                    result["subsystems"] = health["subsystems"]
+                    break
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Point the backend at a throwaway SQLite database before it is imported."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='muxo-test-')}/t.db"
+
+import pytest
+
+
+@pytest.fixture
+def db():
+    from backend import models
+    from backend.db import SessionLocal, engine
+
+    models.Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        models.Base.metadata.drop_all(engine)
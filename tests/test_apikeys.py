@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from backend import apikeys
+from backend.models import ApiKey
+
+
+def test_key_created_elsewhere_works_before_reload(db, monkeypatch):
+    apikeys.verify_api_key(f"{apikeys.API_KEY_PREFIX}0_x")  # load the index
+    monkeypatch.setattr(apikeys, "_missed_at", 0.0)
+    # Written without create_api_key, as another node would.
+    key = f"{apikeys.API_KEY_PREFIX}abc123_secret"
+    db.add(
+        ApiKey(
+            name="crm",
+            key_id="abc123",
+            key_hash=apikeys.hash_api_key(key),
+            role="ops",
+        )
+    )
+    db.commit()
+
+    principal = apikeys.verify_api_key(key)
+
+    assert principal is not None
+    assert (principal.username, principal.role) == ("apikey:crm", "ops")
+    assert apikeys.verify_api_key(key + "x") is None
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from backend import auth
+from backend.models import User
+
+
+def test_principal_cache_dropped_on_commit_only(db):
+    db.add(User(username="ops1", password_hash="x", role="viewer"))
+    db.add(User(username="ops2", password_hash="x", role="viewer"))
+    db.commit()
+    assert auth._load_principal("ops1").role == "viewer"
+    assert auth._load_principal("ops2").role == "viewer"
+
+    user = db.query(User).filter(User.username == "ops1").one()
+    user.role = "admin"
+    db.flush()
+    assert auth._PRINCIPALS.get("ops1") is not None
+    db.commit()
+
+    assert auth._PRINCIPALS.get("ops1") is None
+    assert auth._PRINCIPALS.get("ops2") is not None
+    assert auth._load_principal("ops1").role == "admin"
+
+
+def test_principal_cache_kept_on_rollback_and_dropped_on_rename(db):
+    db.add(User(username="old", password_hash="x", role="ops"))
+    db.commit()
+    auth._load_principal("old")
+    user = db.query(User).filter(User.username == "old").one()
+
+    user.role = "admin"
+    db.flush()
+    db.rollback()
+    assert auth._PRINCIPALS.get("old").role == "ops"
+
+    user.username = "new"
+    db.commit()
+    assert auth._PRINCIPALS.get("old") is None
+    assert auth._load_principal("old") is None
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from backend.bulk import import_contacts
+from backend.imports import _read_rows
+from backend.models import Contact
+
+NDJSON = """\
+{"msisdn": "+14155552671", "name": "Ada"}
+[1, 2]
+{"msisdn": 14155558888}
+not json
+{"name": "no number"}
+"+14155550100"
+
+{"msisdn": "+14155552672"}
+"""
+
+
+def test_ndjson_bad_lines_count_as_invalid(db, tmp_path):
+    path = tmp_path / "contacts.ndjson"
+    path.write_text(NDJSON, encoding="utf-8")
+
+    stats = import_contacts(db, _read_rows(str(path), "ndjson"))
+
+    assert stats["rows"] == 7
+    assert stats["imported"] == 3
+    assert stats["invalid"] == 4
+    contacts = {c.msisdn: c.name for c in db.query(Contact)}
+    assert contacts == {
+        "+14155552671": "Ada",
+        "+14155558888": None,
+        "+14155552672": None,
+    }
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from backend import utils
+
+
+def test_normalize_many_shared_pool_matches_serial(monkeypatch):
+    monkeypatch.setattr(utils, "MSISDN_PARALLEL_THRESHOLD", 10)
+    values = [f"(415) 555-{i % 30:04d}" for i in range(60)] + ["nope", ""]
+    serial = utils.normalize_many(values)
+
+    with utils.normalize_pool(2) as pool:
+        first = utils.normalize_many(values, processes=2, pool=pool)
+        second = utils.normalize_many(values[::-1], processes=2, pool=pool)
+
+    assert first == serial
+    assert second == serial[::-1]
+    assert serial[0] == "+14155550000"
+    assert serial[-2:] == [None, None]